@@ -0,0 +1,43 @@
+"""add property_events query indexes
+
+Revision ID: 4f1c7a2be8d3
+Revises: 9d22ca5e1349
+Create Date: 2026-10-18 10:03:17.842290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c7a2be8d3'
+down_revision: Union[str, Sequence[str], None] = '9d22ca5e1349'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-parcel history and "latest event" lookups. event_date alone is already
+    # covered by the default index create_hypertable() builds.
+    op.create_index(
+        'ix_property_events_raw_parcel_identification_event_date',
+        'property_events',
+        ['raw_parcel_identification', sa.text('event_date DESC')],
+        unique=False
+    )
+    # County-scoped date range queries
+    op.create_index(
+        'ix_property_events_countyname_event_date',
+        'property_events',
+        ['CountyName', sa.text('event_date DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_property_events_countyname_event_date', table_name='property_events')
+    op.drop_index('ix_property_events_raw_parcel_identification_event_date', table_name='property_events')
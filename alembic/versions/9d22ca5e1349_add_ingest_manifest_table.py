@@ -0,0 +1,39 @@
+"""add ingest manifest table
+
+Revision ID: 9d22ca5e1349
+Revises: 53bc2086446d
+Create Date: 2026-10-18 09:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d22ca5e1349'
+down_revision: Union[str, Sequence[str], None] = '53bc2086446d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'ingest_manifest',
+        sa.Column('archive_name', sa.Text(), nullable=False),
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('content_sha256', sa.Text(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('loaded_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('archive_name')
+    )
+    # Natural key used to skip events that were already loaded by an earlier run
+    op.create_index('ix_property_events_salenumber', 'property_events', ['SaleNumber'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_property_events_salenumber', table_name='property_events')
+    op.drop_table('ingest_manifest')
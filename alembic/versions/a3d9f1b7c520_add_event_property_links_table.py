@@ -0,0 +1,44 @@
+"""add event property links table
+
+Revision ID: a3d9f1b7c520
+Revises: f2b6e8a41c95
+Create Date: 2026-10-18 17:24:51.662309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9f1b7c520'
+down_revision: Union[str, Sequence[str], None] = 'f2b6e8a41c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Resolved event -> property links; at most one property per event
+    op.create_table(
+        'event_property_links',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('event_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('property_id', sa.Integer(), nullable=False),
+        sa.Column('synthetic_stateid', sa.Text(), nullable=True),
+        sa.Column('match_strategy', sa.Text(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('linked_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.ForeignKeyConstraint(['property_id'], ['properties.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('event_id', 'event_date')
+    )
+    # Property -> events (parcel history); the primary key covers event -> property
+    op.create_index('ix_event_property_links_property_id_event_date', 'event_property_links',
+                    ['property_id', sa.text('event_date DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_event_property_links_property_id_event_date', table_name='event_property_links')
+    op.drop_table('event_property_links')
@@ -0,0 +1,34 @@
+"""add property_events event_id sequence
+
+Revision ID: a8e3f6d1c402
+Revises: f9b2c4e8a617
+Create Date: 2026-10-19 09:14:26.301847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e3f6d1c402'
+down_revision: Union[str, Sequence[str], None] = 'f9b2c4e8a617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Single source of event_ids: the consumer's inserts take them from the column
+    # default and the bulk loader reserves its ranges from the same sequence.
+    # Owned by the column, so TRUNCATE ... RESTART IDENTITY resets it.
+    op.execute("CREATE SEQUENCE property_events_event_id_seq AS integer OWNED BY property_events.event_id;")
+    op.execute("SELECT setval('property_events_event_id_seq', COALESCE(MAX(event_id), 0) + 1, false) FROM property_events;")
+    op.alter_column('property_events', 'event_id', server_default=sa.text("nextval('property_events_event_id_seq')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('property_events', 'event_id', server_default=None)
+    op.execute("DROP SEQUENCE property_events_event_id_seq;")
@@ -0,0 +1,43 @@
+"""key parcel match results by county
+
+Revision ID: b4c8e2f7a913
+Revises: a8e3f6d1c402
+Create Date: 2026-10-19 11:42:08.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4c8e2f7a913'
+down_revision: Union[str, Sequence[str], None] = 'a8e3f6d1c402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Raw parcel IDs are only unique within a county: one row per orphan
+    # (county, parcel ID). Results without a county cannot be linked safely;
+    # the next matching run rebuilds the table anyway.
+    op.execute("DELETE FROM parcel_match_results WHERE county_name IS NULL;")
+    op.drop_constraint('parcel_match_results_pkey', 'parcel_match_results', type_='primary')
+    op.alter_column('parcel_match_results', 'county_name', existing_type=sa.Text(), nullable=False)
+    op.create_primary_key('parcel_match_results_pkey', 'parcel_match_results', ['county_name', 'parcel_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Keep one row per parcel ID so the old key can be restored
+    op.execute(
+        """
+        DELETE FROM parcel_match_results a USING parcel_match_results b
+        WHERE a.parcel_id = b.parcel_id AND a.county_name > b.county_name;
+        """
+    )
+    op.drop_constraint('parcel_match_results_pkey', 'parcel_match_results', type_='primary')
+    op.alter_column('parcel_match_results', 'county_name', existing_type=sa.Text(), nullable=True)
+    op.create_primary_key('parcel_match_results_pkey', 'parcel_match_results', ['parcel_id'])
@@ -0,0 +1,68 @@
+"""add parcel current state table
+
+Revision ID: b7e2d9c41a06
+Revises: 4f1c7a2be8d3
+Create Date: 2026-10-18 13:05:22.417390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d9c41a06'
+down_revision: Union[str, Sequence[str], None] = '4f1c7a2be8d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Events carry the same synthetic STATEID as the parcels they belong to.
+    # Events loaded before this revision, and their current state, are filled
+    # by scripts/backfill_event_keys.py outside the migration.
+    op.add_column('property_events', sa.Column('synthetic_stateid', sa.Text(), nullable=True))
+    op.create_index(
+        'ix_property_events_synthetic_stateid_event_date',
+        'property_events',
+        ['synthetic_stateid', sa.text('event_date DESC')],
+        unique=False
+    )
+
+    # Latest event per parcel, maintained by the event loaders
+    op.create_table(
+        'parcel_current_state',
+        sa.Column('synthetic_stateid', sa.Text(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('event_date', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('raw_parcel_identification', sa.Text(), nullable=True),
+        sa.Column('CountyName', sa.Text(), nullable=True),
+        sa.Column('PropertyAddress', sa.Text(), nullable=True),
+        sa.Column('PropertyType', sa.Text(), nullable=True),
+        sa.Column('TransferType', sa.Text(), nullable=True),
+        sa.Column('TotalRealEstateValue', sa.Numeric(), nullable=True),
+        sa.Column('GranteeLastName', sa.Text(), nullable=True),
+        sa.Column('GranteeFirstName', sa.Text(), nullable=True),
+        sa.Column('GranteeStreetNumber', sa.Text(), nullable=True),
+        sa.Column('GranteeAddress', sa.Text(), nullable=True),
+        sa.Column('GranteeCity', sa.Text(), nullable=True),
+        sa.Column('GranteeState', sa.Text(), nullable=True),
+        sa.Column('GranteeZip', sa.Text(), nullable=True),
+        sa.Column('TaxBillName', sa.Text(), nullable=True),
+        sa.Column('TaxBillStreetNumber', sa.Text(), nullable=True),
+        sa.Column('TaxBillAddress', sa.Text(), nullable=True),
+        sa.Column('TaxBillCity', sa.Text(), nullable=True),
+        sa.Column('TaxBillState', sa.Text(), nullable=True),
+        sa.Column('TaxBillZip', sa.Text(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('synthetic_stateid')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('parcel_current_state')
+    op.drop_index('ix_property_events_synthetic_stateid_event_date', table_name='property_events')
+    op.drop_column('property_events', 'synthetic_stateid')
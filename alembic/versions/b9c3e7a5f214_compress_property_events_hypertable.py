@@ -0,0 +1,53 @@
+"""compress property events hypertable
+
+Revision ID: b9c3e7a5f214
+Revises: c6e4a2f8d173
+Create Date: 2026-10-18 18:46:09.573120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c3e7a5f214'
+down_revision: Union[str, Sequence[str], None] = 'c6e4a2f8d173'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# RETR records ~150-200k sales a year statewide. The default 7-day chunks hold
+# only a few dozen rows per county, far below the 1000-row batches compression
+# works on; yearly chunks fill them. Applies to chunks created from now on, so
+# existing data moves to the new interval on its next full reload.
+CHUNK_TIME_INTERVAL = "INTERVAL '365 days'"
+DEFAULT_CHUNK_TIME_INTERVAL = "INTERVAL '7 days'"
+# Sales are recorded months after they happen; leave recent chunks row-oriented
+COMPRESS_AFTER = "INTERVAL '6 months'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(f"SELECT set_chunk_time_interval('property_events', {CHUNK_TIME_INTERVAL});")
+    # One compressed segment per county, rows inside it newest first: county and
+    # date-range scans decompress only the matching segments and batches.
+    op.execute(
+        """
+        ALTER TABLE property_events SET (
+            timescaledb.compress,
+            timescaledb.compress_segmentby = '"CountyName"',
+            timescaledb.compress_orderby = 'event_date DESC, event_id'
+        );
+        """
+    )
+    # No retention policy: the full sales history is the product
+    op.execute(f"SELECT add_compression_policy('property_events', compress_after => {COMPRESS_AFTER});")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("SELECT remove_compression_policy('property_events', if_exists => true);")
+    op.execute("SELECT decompress_chunk(c, if_compressed => true) FROM show_chunks('property_events') c;")
+    op.execute("ALTER TABLE property_events SET (timescaledb.compress = false);")
+    op.execute(f"SELECT set_chunk_time_interval('property_events', {DEFAULT_CHUNK_TIME_INTERVAL});")
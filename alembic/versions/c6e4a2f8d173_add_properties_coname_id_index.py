@@ -0,0 +1,29 @@
+"""add properties coname id index
+
+Revision ID: c6e4a2f8d173
+Revises: a3d9f1b7c520
+Create Date: 2026-10-18 18:11:36.204817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6e4a2f8d173'
+down_revision: Union[str, Sequence[str], None] = 'a3d9f1b7c520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-county scans in id order (RAG export, county reloads) without a sort
+    op.create_index('ix_properties_coname_id', 'properties', ['CONAME', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_coname_id', table_name='properties')
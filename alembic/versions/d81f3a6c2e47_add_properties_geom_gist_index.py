@@ -0,0 +1,32 @@
+"""add properties geom gist index
+
+Revision ID: d81f3a6c2e47
+Revises: b7e2d9c41a06
+Create Date: 2026-10-18 14:21:08.930254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3a6c2e47'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d9c41a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Some GeoAlchemy2 versions create this index implicitly with the table;
+    # replace it with an explicitly managed one so it is not built twice.
+    op.execute('DROP INDEX IF EXISTS idx_properties_geom;')
+    # Bounding-box, radius and point-in-polygon lookups on parcel polygons
+    op.create_index('ix_properties_geom', 'properties', ['geom'], unique=False, postgresql_using='gist')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_geom', table_name='properties', postgresql_using='gist')
@@ -0,0 +1,46 @@
+"""add parcel match results table
+
+Revision ID: e5a0c7d3b912
+Revises: d81f3a6c2e47
+Create Date: 2026-10-18 15:02:47.116583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c7d3b912'
+down_revision: Union[str, Sequence[str], None] = 'd81f3a6c2e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per orphan event parcel ID from the latest fuzzy matching run
+    op.create_table(
+        'parcel_match_results',
+        sa.Column('parcel_id', sa.Text(), nullable=False),
+        sa.Column('property_address', sa.Text(), nullable=True),
+        sa.Column('grantee_zip', sa.Text(), nullable=True),
+        sa.Column('county_name', sa.Text(), nullable=True),
+        sa.Column('blocking_key', sa.Text(), nullable=True),
+        sa.Column('matched_stateid', sa.Text(), nullable=True),
+        sa.Column('matched_synthetic_stateid', sa.Text(), nullable=True),
+        sa.Column('address_score', sa.Float(), nullable=True),
+        sa.Column('parcel_id_score', sa.Float(), nullable=True),
+        sa.Column('combined_score', sa.Float(), nullable=True),
+        sa.Column('matched_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.PrimaryKeyConstraint('parcel_id')
+    )
+    op.create_index('ix_parcel_match_results_matched_synthetic_stateid', 'parcel_match_results',
+                    ['matched_synthetic_stateid'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_parcel_match_results_matched_synthetic_stateid', table_name='parcel_match_results')
+    op.drop_table('parcel_match_results')
@@ -0,0 +1,48 @@
+"""add parcel scores table
+
+Revision ID: e7a1d5c9b248
+Revises: d4f8b2c6e391
+Create Date: 2026-10-18 19:58:12.840617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1d5c9b248'
+down_revision: Union[str, Sequence[str], None] = 'd4f8b2c6e391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per parcel with its absentee-owner signals and target score (see scoring.py)
+    op.create_table(
+        'parcel_scores',
+        sa.Column('property_id', sa.Integer(), nullable=False),
+        sa.Column('synthetic_stateid', sa.Text(), nullable=True),
+        sa.Column('CONAME', sa.Text(), nullable=True),
+        sa.Column('absentee_owner', sa.Boolean(), nullable=True),
+        sa.Column('out_of_state_owner', sa.Boolean(), nullable=True),
+        sa.Column('tax_bill_elsewhere', sa.Boolean(), nullable=True),
+        sa.Column('grantee_out_of_state', sa.Boolean(), nullable=True),
+        sa.Column('last_sale_date', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('holding_years', sa.Float(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('scored_at', sa.DateTime(timezone=True), server_default=sa.text('NOW()'), nullable=False),
+        sa.ForeignKeyConstraint(['property_id'], ['properties.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('property_id')
+    )
+    # Top-N targets of a county, read in index order
+    op.create_index('ix_parcel_scores_coname_score', 'parcel_scores',
+                    ['CONAME', sa.text('score DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_parcel_scores_coname_score', table_name='parcel_scores')
+    op.drop_table('parcel_scores')
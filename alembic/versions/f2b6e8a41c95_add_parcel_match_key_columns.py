@@ -0,0 +1,67 @@
+"""add parcel match key columns
+
+Revision ID: f2b6e8a41c95
+Revises: e5a0c7d3b912
+Create Date: 2026-10-18 16:10:35.284017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6e8a41c95'
+down_revision: Union[str, Sequence[str], None] = 'e5a0c7d3b912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Match keys written by the loaders (see normalization/normalize.py); one column per strategy
+    for table in ('properties', 'property_events'):
+        op.add_column(table, sa.Column('parcel_key_stripped', sa.Text(), nullable=True))
+        op.add_column(table, sa.Column('parcel_key_normalized', sa.Text(), nullable=True))
+
+    # Backfill already loaded rows with the SQL equivalent of the loaders' normalization
+    op.execute(
+        r"""
+        UPDATE properties SET
+            parcel_key_stripped = upper(btrim("PARCELID", E' \t\r\n')),
+            parcel_key_normalized = upper(regexp_replace("PARCELID", '[\W_]+', '', 'g'))
+        WHERE "PARCELID" IS NOT NULL;
+        """
+    )
+    op.execute(
+        r"""
+        UPDATE property_events SET
+            parcel_key_stripped = regexp_replace(upper(btrim(raw_parcel_identification, E' \t\r\n')), '^PRCL', ''),
+            parcel_key_normalized = upper(regexp_replace(
+                regexp_replace(upper(btrim(raw_parcel_identification, E' \t\r\n')), '^PRCL[0-9]{3}-', ''),
+                '[\W_]+', '', 'g'))
+        WHERE raw_parcel_identification IS NOT NULL;
+        """
+    )
+
+    # Matching joins within a county on either key
+    op.create_index('ix_properties_coname_parcel_key_stripped', 'properties',
+                    ['CONAME', 'parcel_key_stripped'], unique=False)
+    op.create_index('ix_properties_coname_parcel_key_normalized', 'properties',
+                    ['CONAME', 'parcel_key_normalized'], unique=False)
+    op.create_index('ix_property_events_countyname_parcel_key_stripped', 'property_events',
+                    ['CountyName', 'parcel_key_stripped'], unique=False)
+    op.create_index('ix_property_events_countyname_parcel_key_normalized', 'property_events',
+                    ['CountyName', 'parcel_key_normalized'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_property_events_countyname_parcel_key_normalized', table_name='property_events')
+    op.drop_index('ix_property_events_countyname_parcel_key_stripped', table_name='property_events')
+    op.drop_index('ix_properties_coname_parcel_key_normalized', table_name='properties')
+    op.drop_index('ix_properties_coname_parcel_key_stripped', table_name='properties')
+    for table in ('property_events', 'properties'):
+        op.drop_column(table, 'parcel_key_normalized')
+        op.drop_column(table, 'parcel_key_stripped')
@@ -0,0 +1,39 @@
+"""add canonical address columns
+
+Revision ID: f9b2c4e8a617
+Revises: e7a1d5c9b248
+Create Date: 2026-10-18 20:37:55.129408
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9b2c4e8a617'
+down_revision: Union[str, Sequence[str], None] = 'e7a1d5c9b248'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    # Canonical street address lines written by the loaders: SITEADRESS for
+    # parcels, PropertyAddress for events. Rows loaded before this revision are
+    # filled by scripts/backfill_address_canonical.py, outside the migration.
+    op.add_column('properties', sa.Column('address_canonical', sa.Text(), nullable=True))
+    op.add_column('property_events', sa.Column('address_canonical', sa.Text(), nullable=True))
+
+    # Trigram index serving exact (=), LIKE and similarity (%) parcel address lookups
+    op.create_index('ix_properties_address_canonical_trgm', 'properties', ['address_canonical'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'address_canonical': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_properties_address_canonical_trgm', table_name='properties')
+    op.drop_column('property_events', 'address_canonical')
+    op.drop_column('properties', 'address_canonical')
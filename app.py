@@ -1,2 +1,459 @@
-# Placeholder for the main application file.
-print("Backend service started.")
+import os
+import json
+import math
+import zlib
+import logging
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+
+import asyncpg
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+
+from normalization import build_event_keys, canonicalize_address
+from tile_cache import read_tile, write_tile
+from rag_export import (EXPORT_QUERY_TEMPLATE, FETCH_SIZE, GZIP_LEVEL, default_output_path, encode_document,
+                        render_documents, split_last_parcel)
+
+# --- Configuration ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [API] - %(message)s')
+
+# Database connection details from environment variables
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+POOL_MIN_SIZE = int(os.getenv('API_POOL_MIN_SIZE', '2'))
+POOL_MAX_SIZE = int(os.getenv('API_POOL_MAX_SIZE', '10'))
+MAX_EVENTS_PER_REQUEST = 5000
+MAX_PROPERTIES_PER_REQUEST = 5000
+MAX_RADIUS_METERS = 50000
+METERS_PER_DEGREE_LATITUDE = 111320
+
+# Parcel attributes returned by the spatial endpoints
+PROPERTY_SUMMARY_COLUMNS = [
+    'id', 'synthetic_stateid', 'PARCELID', 'OWNERNME1', 'OWNERNME2', 'SITEADRESS', 'PLACENAME',
+    'ZIPCODE', 'CONAME', 'PROPCLASS', 'CNTASSDVALUE', 'ESTFMKVALUE', 'GISACRES', 'LATITUDE', 'LONGITUDE',
+]
+PROPERTY_SUMMARY_SQL = ', '.join(f'p."{col}"' for col in PROPERTY_SUMMARY_COLUMNS)
+
+# Vector tiles: below MIN_TILE_ZOOM a tile would cover too many parcels to be useful
+MIN_TILE_ZOOM = int(os.getenv('MIN_TILE_ZOOM', '12'))
+MAX_TILE_ZOOM = 22
+TILE_EXTENT = 4096 # MVT coordinate resolution per tile side
+TILE_BUFFER = 64 # Extra tile units rendered around the edges so polygon outlines join up
+WEB_MERCATOR_WORLD_METERS = 40075016.68
+TILE_ATTRIBUTE_COLUMNS = ['id', 'synthetic_stateid', 'PARCELID', 'OWNERNME1', 'SITEADRESS', 'CONAME', 'PROPCLASS', 'CNTASSDVALUE']
+MVT_MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+
+# Sales statistics: rolls rows of the county_monthly_sales continuous aggregate
+# up to the requested grouping. Percentiles come from the stored sketches.
+SALES_STATS_MEASURES_SQL = """
+    SUM(sales) AS sales,
+    SUM(valued_sales) AS valued_sales,
+    SUM(total_value) AS total_value,
+    SUM(total_value) / NULLIF(SUM(valued_sales), 0) AS avg_value,
+    approx_percentile(0.25, rollup(value_percentiles)) AS p25_value,
+    approx_percentile(0.5, rollup(value_percentiles)) AS median_value,
+    approx_percentile(0.75, rollup(value_percentiles)) AS p75_value,
+    SUM(total_transfer_fee) AS total_transfer_fee,
+    SUM(total_transfer_fee) / NULLIF(SUM(fee_sales), 0) AS avg_transfer_fee,
+    approx_percentile(0.5, rollup(transfer_fee_percentiles)) AS median_transfer_fee,
+    SUM(waterfront_sales)::float / NULLIF(SUM(sales), 0) AS waterfront_share
+"""
+
+# --- Application Setup ---
+
+async def init_connection(connection):
+    """Decodes json columns (e.g. ST_AsGeoJSON(...)::json) into Python objects."""
+    await connection.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+@asynccontextmanager
+async def lifespan(app):
+    """Opens the shared connection pool on startup and closes it on shutdown."""
+    logging.info(f"Creating database pool for {DB_HOST} ({POOL_MIN_SIZE}-{POOL_MAX_SIZE} connections)...")
+    app.state.pool = await asyncpg.create_pool(DATABASE_URL, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                                               init=init_connection)
+    yield
+    await app.state.pool.close()
+
+app = FastAPI(title="Property Finder Query Service", lifespan=lifespan)
+
+# --- Endpoints ---
+
+@app.get("/health")
+async def health():
+    """Reports whether the service can reach the database."""
+    try:
+        async with app.state.pool.acquire() as connection:
+            await connection.fetchval("SELECT 1;")
+    except Exception as e:
+        logging.error(f"Health check failed: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ok"}
+
+@app.get("/parcels/{parcel_id}/events")
+async def get_parcel_events(
+    parcel_id: str,
+    county: str,
+    limit: int = Query(500, ge=1, le=MAX_EVENTS_PER_REQUEST),
+):
+    """
+    Returns the event history of a parcel of `county`, newest first.
+    Recent, uncompressed chunks are served by the (raw_parcel_identification,
+    event_date DESC) index. Compressed chunks are segmented by CountyName, so
+    the county filter limits decompression to that county's segments.
+    """
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            """
+            SELECT * FROM property_events
+            WHERE raw_parcel_identification = $1 AND "CountyName" = $2
+            ORDER BY event_date DESC
+            LIMIT $3;
+            """,
+            parcel_id, county.upper(), limit
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/parcels/{parcel_id}/state")
+async def get_parcel_state(parcel_id: str, county: str):
+    """
+    Returns the current state of a parcel of `county`: its most recent event.
+    The RETR parcel ID is normalized exactly as at ingestion and the state is
+    read from parcel_current_state by synthetic_stateid, without touching the
+    compressed event chunks.
+    """
+    synthetic_stateid = build_event_keys(pd.Series([parcel_id]), pd.Series([county]))['synthetic_stateid'].iloc[0]
+    if synthetic_stateid is None:
+        raise HTTPException(status_code=404, detail=f"Unknown county {county}")
+    return await get_property_state(synthetic_stateid)
+
+@app.get("/properties/{property_id}/events")
+async def get_property_events(
+    property_id: int,
+    limit: int = Query(500, ge=1, le=MAX_EVENTS_PER_REQUEST),
+):
+    """
+    Returns the events linked to a property, newest first, with how each was matched.
+    A single indexed join through event_property_links.
+    """
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            """
+            SELECT e.*, l.match_strategy, l.score
+            FROM event_property_links l
+            JOIN property_events e ON e.event_id = l.event_id AND e.event_date = l.event_date
+            WHERE l.property_id = $1
+            ORDER BY l.event_date DESC
+            LIMIT $2;
+            """,
+            property_id, limit
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/properties/{synthetic_stateid}/state")
+async def get_property_state(synthetic_stateid: str):
+    """
+    Returns the current state of a parcel (latest owner, sale and transfer type)
+    as a single primary-key read of parcel_current_state.
+    """
+    async with app.state.pool.acquire() as connection:
+        row = await connection.fetchrow(
+            "SELECT * FROM parcel_current_state WHERE synthetic_stateid = $1;",
+            synthetic_stateid.upper()
+        )
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No current state found for {synthetic_stateid}")
+    return dict(row)
+
+def geometry_sql(include_geometry):
+    """Returns the extra select item carrying each parcel's polygon as GeoJSON, if requested."""
+    return ', ST_AsGeoJSON(p.geom)::json AS geometry' if include_geometry else ''
+
+@app.get("/properties/bbox")
+async def get_properties_in_bbox(
+    min_lon: float = Query(..., ge=-180, le=180),
+    min_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    include_geometry: bool = False,
+    limit: int = Query(1000, ge=1, le=MAX_PROPERTIES_PER_REQUEST),
+):
+    """Returns the parcels whose polygon overlaps a WGS 84 bounding box, via the geom GiST index."""
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=422, detail="Bounding box minimums must not exceed its maximums")
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT {PROPERTY_SUMMARY_SQL}{geometry_sql(include_geometry)}
+            FROM properties p
+            WHERE p.geom && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+            LIMIT $5;
+            """,
+            min_lon, min_lat, max_lon, max_lat, limit
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/properties/near")
+async def get_properties_near(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-89, le=89),
+    radius_m: float = Query(1000, gt=0, le=MAX_RADIUS_METERS),
+    include_geometry: bool = False,
+    limit: int = Query(500, ge=1, le=MAX_PROPERTIES_PER_REQUEST),
+):
+    """
+    Returns the parcels within `radius_m` meters of a point, nearest first.
+    - A degree envelope around the point, computed here, lets the geom GiST
+      index prefilter candidates.
+    - Only those candidates get the exact ST_DWithin test on geography.
+    """
+    lat_delta = radius_m / METERS_PER_DEGREE_LATITUDE
+    lon_delta = radius_m / (METERS_PER_DEGREE_LATITUDE * math.cos(math.radians(lat)))
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT {PROPERTY_SUMMARY_SQL}{geometry_sql(include_geometry)},
+                   ST_Distance(p.geom::geography, target.point) AS distance_m
+            FROM properties p,
+                 (SELECT ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography AS point) AS target
+            WHERE p.geom && ST_MakeEnvelope($1 - $4, $2 - $3, $1 + $4, $2 + $3, 4326)
+              AND ST_DWithin(p.geom::geography, target.point, $5)
+            ORDER BY distance_m
+            LIMIT $6;
+            """,
+            lon, lat, lat_delta, lon_delta, radius_m, limit
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/properties/search")
+async def search_properties_by_address(
+    address: str,
+    county: Optional[str] = None,
+    min_similarity: float = Query(0.3, gt=0, le=1),
+    limit: int = Query(20, ge=1, le=MAX_PROPERTIES_PER_REQUEST),
+):
+    """
+    Returns the parcels whose site address resembles `address`, most similar first.
+    - The query is canonicalized exactly like SITEADRESS at ingestion, so
+      '123 North Main Street' and '123 N MAIN ST' find the same parcels.
+    - Candidates come from the trigram index on address_canonical; an exact
+      canonical match has a similarity of 1.
+    """
+    canonical = canonicalize_address(address)
+    if canonical is None:
+        raise HTTPException(status_code=422, detail="address must not be blank")
+
+    async with app.state.pool.acquire() as connection:
+        async with connection.transaction():
+            # The % operator matches at or above this threshold; local to the transaction
+            await connection.execute("SELECT set_config('pg_trgm.similarity_threshold', $1, true);", str(min_similarity))
+            rows = await connection.fetch(
+                f"""
+                SELECT similarity(p.address_canonical, $1) AS address_similarity, p.address_canonical,
+                       {PROPERTY_SUMMARY_SQL}
+                FROM properties p
+                WHERE p.address_canonical % $1
+                  AND ($2::text IS NULL OR p."CONAME" = $2)
+                ORDER BY address_similarity DESC, p.id
+                LIMIT $3;
+                """,
+                canonical, county.upper() if county else None, limit
+            )
+    return [dict(row) for row in rows]
+
+@app.get("/properties/at")
+async def get_properties_at(
+    lon: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    include_geometry: bool = False,
+):
+    """Returns the parcel(s) containing a point, via the geom GiST index."""
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT {PROPERTY_SUMMARY_SQL}{geometry_sql(include_geometry)}
+            FROM properties p
+            WHERE ST_Intersects(p.geom, ST_SetSRID(ST_MakePoint($1, $2), 4326));
+            """,
+            lon, lat
+        )
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No parcel found at ({lon}, {lat})")
+    return [dict(row) for row in rows]
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_parcel_tile(z: int, x: int, y: int):
+    """
+    Returns a Mapbox Vector Tile of the parcel polygons in a Web Mercator tile.
+    - Polygons are simplified to the tile's pixel size before ST_AsMVTGeom
+      quantizes them, so low zooms do not carry invisible vertices.
+    - Rendered tiles are cached on disk; ingest_geodata invalidates them on reload.
+    - Tiles below MIN_TILE_ZOOM are empty (204).
+    """
+    if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{y} does not exist")
+    if z < MIN_TILE_ZOOM:
+        return Response(status_code=204)
+
+    content = await run_in_threadpool(read_tile, z, x, y)
+    if content is None:
+        tolerance = WEB_MERCATOR_WORLD_METERS / (2 ** z) / TILE_EXTENT # One tile unit, in meters
+        attributes = ', '.join(f'p."{col}"' for col in TILE_ATTRIBUTE_COLUMNS)
+        async with app.state.pool.acquire() as connection:
+            content = await connection.fetchval(
+                f"""
+                WITH bounds AS (
+                    SELECT ST_TileEnvelope($1, $2, $3) AS envelope,
+                           ST_Transform(ST_TileEnvelope($1, $2, $3, margin => $5), 4326) AS search_area
+                ),
+                tile AS (
+                    SELECT {attributes},
+                           ST_AsMVTGeom(ST_Simplify(ST_Transform(p.geom, 3857), $4, true), bounds.envelope,
+                                        {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom
+                    FROM properties p, bounds
+                    WHERE p.geom && bounds.search_area
+                )
+                SELECT ST_AsMVT(tile, 'parcels', {TILE_EXTENT}, 'geom') FROM tile WHERE geom IS NOT NULL;
+                """,
+                z, x, y, tolerance, TILE_BUFFER / TILE_EXTENT
+            )
+        content = bytes(content or b'')
+        await run_in_threadpool(write_tile, z, x, y, content)
+
+    return Response(content=content, media_type=MVT_MEDIA_TYPE)
+
+@app.get("/counties/{county}/targets")
+async def get_county_targets(
+    county: str,
+    min_score: float = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PROPERTIES_PER_REQUEST),
+):
+    """
+    Returns a county's highest-scoring absentee-owner targets (see scoring.py),
+    best first, with the signals behind each score.
+    An index scan of (CONAME, score DESC) on parcel_scores; nothing is recomputed.
+    """
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT s.score, s.absentee_owner, s.out_of_state_owner, s.tax_bill_elsewhere,
+                   s.grantee_out_of_state, s.last_sale_date, s.holding_years, {PROPERTY_SUMMARY_SQL}
+            FROM parcel_scores s
+            JOIN properties p ON p.id = s.property_id
+            WHERE s."CONAME" = $1 AND s.score >= $2
+            ORDER BY s.score DESC
+            LIMIT $3;
+            """,
+            county.upper(), min_score, limit
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/stats/counties/{county}/monthly")
+async def get_county_monthly_stats(
+    county: str,
+    property_type: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """
+    Returns a county's sales statistics per month (oldest first) over [start, end),
+    across all property types unless `property_type` is given.
+    Read from the county_monthly_sales continuous aggregate, never from property_events.
+    """
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT month, {SALES_STATS_MEASURES_SQL}
+            FROM county_monthly_sales
+            WHERE county_name = $1
+              AND ($2::text IS NULL OR property_type = $2)
+              AND ($3::date IS NULL OR month >= $3)
+              AND ($4::date IS NULL OR month < $4)
+            GROUP BY month
+            ORDER BY month;
+            """,
+            county.upper(), property_type, start, end
+        )
+    return [dict(row) for row in rows]
+
+@app.get("/stats/property-types/monthly")
+async def get_property_type_monthly_stats(
+    county: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """
+    Returns sales statistics per month and property type over [start, end),
+    statewide or for one county. Read from the county_monthly_sales continuous aggregate.
+    """
+    async with app.state.pool.acquire() as connection:
+        rows = await connection.fetch(
+            f"""
+            SELECT month, property_type, {SALES_STATS_MEASURES_SQL}
+            FROM county_monthly_sales
+            WHERE ($1::text IS NULL OR county_name = $1)
+              AND ($2::date IS NULL OR month >= $2)
+              AND ($3::date IS NULL OR month < $3)
+            GROUP BY month, property_type
+            ORDER BY month, property_type;
+            """,
+            county.upper() if county else None, start, end
+        )
+    return [dict(row) for row in rows]
+
+async def stream_rag_export(county, compress):
+    """
+    Yields the JSONL RAG documents of a county one fetched block at a time, read
+    through a server-side cursor so the county is never held in memory.
+    Documents are rendered by rag_export.render_documents(), like the CLI's.
+    With `compress`, the stream is a single gzip stream.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None # wbits=31: gzip framing
+    async with app.state.pool.acquire() as connection:
+        async with connection.transaction():
+            cursor = await connection.cursor(EXPORT_QUERY_TEMPLATE.format(county='$1', after_id='$2'), county, 0)
+            pending = [] # Rows of a parcel that may continue in the next block
+            while True:
+                rows = await cursor.fetch(FETCH_SIZE)
+                if not rows:
+                    break
+                complete, pending = split_last_parcel(pending + rows)
+                data = b''.join(encode_document(document) for document in render_documents(complete))
+                if data:
+                    yield compressor.compress(data) if compressor else data
+
+    data = b''.join(encode_document(document) for document in render_documents(pending))
+    yield compressor.compress(data) + compressor.flush() if compressor else data
+
+@app.get("/counties/{county}/rag-export")
+async def export_county_documents(county: str, gzip: bool = False):
+    """
+    Streams every parcel of a county as JSONL RAG documents (see rag_export.py),
+    optionally gzip-compressed. Use the rag_export CLI for resumable exports to disk.
+    """
+    county = county.upper()
+    async with app.state.pool.acquire() as connection:
+        exists = await connection.fetchval(
+            'SELECT EXISTS (SELECT 1 FROM properties WHERE "CONAME" = $1);', county
+        )
+    if not exists:
+        raise HTTPException(status_code=404, detail=f"No properties found for county {county}")
+
+    filename = os.path.basename(default_output_path(county, gzip))
+    return StreamingResponse(
+        stream_rag_export(county, gzip),
+        media_type='application/gzip' if gzip else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv('API_PORT', '8000')))
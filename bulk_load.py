@@ -0,0 +1,61 @@
+import io
+import logging
+
+# --- Configuration ---
+# Number of DataFrame rows serialized into a single COPY FROM STDIN call.
+COPY_BATCH_ROWS = 100000
+
+# --- Bulk Loading Helpers ---
+
+def quote_ident(name):
+    """Double-quotes a column or table name so mixed-case RETR/GDB columns survive."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def copy_dataframe(cursor, df, table, batch_rows=COPY_BATCH_ROWS):
+    """
+    Streams a DataFrame into `table` through COPY FROM STDIN in CSV format.
+    - Rows are serialized `batch_rows` at a time, so the text buffer never holds
+      more than one batch.
+    - NaN/None values are written as unquoted empty fields, which COPY loads as NULL.
+    """
+    columns = ', '.join(quote_ident(col) for col in df.columns)
+    copy_sql = f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    for start in range(0, len(df), batch_rows):
+        buffer = io.StringIO()
+        df.iloc[start:start + batch_rows].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+
+def staging_table_name(table):
+    """Returns the quoted name of the temporary staging table load_via_staging() fills for `table`."""
+    return quote_ident(f"{table}_staging")
+
+def load_via_staging(cursor, df, table, insert_suffix=''):
+    """
+    Loads a DataFrame into `table` with COPY into a temporary staging table
+    followed by a single set-based INSERT ... SELECT.
+    - The staging table copies the column types of `table`, so Postgres performs
+      all type conversion during COPY.
+    - `insert_suffix` is appended to the final INSERT (e.g. a WHERE or ON CONFLICT
+      clause); staged rows can be referenced through the `staged` alias.
+    - The staging table lives until the transaction ends, so the caller can run
+      further statements against it (see staging_table_name()).
+    - Returns the number of rows inserted into `table`.
+    """
+    staging_table = staging_table_name(table)
+    columns = ', '.join(quote_ident(col) for col in df.columns)
+
+    cursor.execute(f"DROP TABLE IF EXISTS {staging_table};")
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+        f"SELECT {columns} FROM {quote_ident(table)} WITH NO DATA;"
+    )
+    copy_dataframe(cursor, df, staging_table)
+    logging.debug(f"Copied {len(df)} rows into {staging_table}.")
+
+    cursor.execute(
+        f"INSERT INTO {quote_ident(table)} ({columns}) "
+        f"SELECT {columns} FROM {staging_table} AS staged {insert_suffix};"
+    )
+    return cursor.rowcount
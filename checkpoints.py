@@ -0,0 +1,19 @@
+import os
+import json
+
+# --- Checkpoint Files ---
+# Progress of resumable jobs (producer, RAG export) saved as small JSON files.
+
+def read_checkpoint(path):
+    """Returns the checkpoint saved at `path`, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_checkpoint(path, checkpoint):
+    """Atomically replaces the checkpoint file so a crash never leaves it half-written."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
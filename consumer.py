@@ -2,11 +2,21 @@ import os
 import pika
 import json
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
+import sqlalchemy as sa
 import time
+import signal
+import argparse
+import multiprocessing
+import pandas as pd
+
+from current_state import build_refresh_sql
+from event_links import build_link_statements
+from scoring import build_score_sql
+from normalization import build_event_keys, canonicalize_address
 
 # --- Configuration ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [CONSUMER] - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [CONSUMER] - %(processName)s - %(message)s')
 
 # RabbitMQ connection details
 RABBITMQ_USER = os.getenv('RABBITMQ_DEFAULT_USER', 'user')
@@ -17,6 +27,13 @@ EXCHANGE_NAME = 'property_events_exchange'
 QUEUE_NAME = 'property_events_queue'
 ROUTING_KEY = 'property.event.sale'
 
+# Batching: messages are inserted and acked in batches of up to CONSUMER_BATCH_SIZE,
+# or whatever has arrived after CONSUMER_BATCH_TIMEOUT_MS, whichever comes first.
+PREFETCH_COUNT = int(os.getenv('CONSUMER_PREFETCH_COUNT', '2000'))
+BATCH_SIZE = int(os.getenv('CONSUMER_BATCH_SIZE', '1000'))
+BATCH_TIMEOUT_MS = int(os.getenv('CONSUMER_BATCH_TIMEOUT_MS', '250'))
+WORKERS = int(os.getenv('CONSUMER_WORKERS', '1'))
+
 # Database connection details
 DB_USER = os.getenv('POSTGRES_USER', 'user')
 DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
@@ -25,86 +42,299 @@ DB_PORT = os.getenv('DB_PORT', '5432')
 DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+EVENTS_TABLE = 'property_events'
+# RETR fields stored under another column name, as in ingest_events.transform_events()
+RETR_RENAMES = {'ParcelIdentification': 'raw_parcel_identification', 'DeedDate': 'event_date'}
+# Columns filled in by the consumer or the database rather than copied from the RETR record;
+# event_id is assigned by the column's sequence default
+DERIVED_COLUMNS = {'event_id', 'synthetic_stateid', 'parcel_key_stripped', 'parcel_key_normalized', 'address_canonical'}
+# Errors that say nothing about the events themselves: the batch is requeued and retried later
+TRANSIENT_ERRORS = (sa.exc.OperationalError, sa.exc.InterfaceError)
+RETRY_DELAY_SECONDS = 5
+
+# Folds the batch's parcels into parcel_current_state in the insert transaction
+REFRESH_CURRENT_STATE = sa.text(build_refresh_sql("e.synthetic_stateid = ANY(:synthetic_stateids)"))
+# Links the batch's events to their properties, also in the insert transaction
+LINK_EVENTS = [sa.text(statement) for statement in build_link_statements("e.synthetic_stateid = ANY(:synthetic_stateids)")]
+# Rescores the parcels whose current state the batch may have changed
+SCORE_PARCELS = sa.text(build_score_sql("p.synthetic_stateid = ANY(:synthetic_stateids)"))
+
+# Created lazily so each worker process builds its own pool after forking
+_engine = None
+
 # --- Main Consumer Logic ---
 
-def get_db_connection():
-    """Establishes and returns a database connection."""
-    while True:
+def get_engine():
+    """Returns this process's pooled database engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, pool_size=1, max_overflow=0, pool_pre_ping=True)
+    return _engine
+
+def wait_to_retry(should_stop):
+    """Waits RETRY_DELAY_SECONDS in short steps; returns True as soon as a stop is requested."""
+    deadline = time.monotonic() + RETRY_DELAY_SECONDS
+    while time.monotonic() < deadline:
+        if should_stop():
+            return True
+        time.sleep(0.2)
+    return should_stop()
+
+def get_db_connection(should_stop=lambda: False):
+    """
+    Checks out and returns a connection from this process's pool, retrying
+    until it succeeds. Returns None if `should_stop()` becomes true first.
+    """
+    while not should_stop():
         try:
-            engine = create_engine(DATABASE_URL)
-            connection = engine.connect()
+            connection = get_engine().connect()
             logging.info("Successfully connected to the database.")
             return connection
         except Exception as e:
-            logging.error(f"Failed to connect to the database: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
+            logging.error(f"Failed to connect to the database: {e}. Retrying in {RETRY_DELAY_SECONDS} seconds...")
+            if wait_to_retry(should_stop):
+                break
+    return None
 
-def setup_rabbitmq():
-    """Sets up RabbitMQ connection, channel, exchange, and queue."""
-    while True:
+def setup_rabbitmq(should_stop=lambda: False):
+    """
+    Sets up RabbitMQ connection, channel, exchange, and queue, retrying until it
+    succeeds. Returns (None, None) if `should_stop()` becomes true first.
+    """
+    while not should_stop():
         try:
             connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
             channel = connection.channel()
             channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type='topic', durable=True)
             channel.queue_declare(queue=QUEUE_NAME, durable=True)
             channel.queue_bind(exchange=EXCHANGE_NAME, queue=QUEUE_NAME, routing_key=ROUTING_KEY)
-            channel.basic_qos(prefetch_count=1) # Process one message at a time
+            channel.basic_qos(prefetch_count=PREFETCH_COUNT) # Keep enough messages in flight to fill a batch
             logging.info("Successfully connected to RabbitMQ and set up channel.")
             return connection, channel
         except pika.exceptions.AMQPConnectionError as e:
-            logging.error(f"Failed to connect to RabbitMQ: {e}. Retrying in 5 seconds...")
-            time.sleep(5)
+            logging.error(f"Failed to connect to RabbitMQ: {e}. Retrying in {RETRY_DELAY_SECONDS} seconds...")
+            if wait_to_retry(should_stop):
+                break
+    return None, None
+
+def load_events_table(db_connection):
+    """Reflects the property_events table, so messages are mapped onto its actual columns."""
+    events_table = sa.Table(EVENTS_TABLE, sa.MetaData(), autoload_with=db_connection)
+    db_connection.rollback() # End the transaction reflection opened
+    return events_table
 
-def main():
-    """Main function to consume messages and insert them into the database."""
-    db_connection = get_db_connection()
-    mq_connection, channel = setup_rabbitmq()
+def text_value(value):
+    """Turns a JSON value into text for a text column; integral numbers lose the '.0' pandas gave them."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def parse_event(body, events_table):
+    """
+    Decodes a message body into a row for the property_events insert.
+    - The RETR record in the message's 'data' is mapped onto the table's columns
+      by name, with the same renames as the bulk loader; unknown fields are dropped.
+    - event_date is the message's date, falling back to DeedDate and DateRecorded.
+    assign_parcel_keys() later fills in the synthetic_stateid and match keys.
+    """
+    event_data = json.loads(body)
+    data = {RETR_RENAMES.get(key, key): value for key, value in (event_data.get('data') or {}).items()}
+    row = {}
+    for column in events_table.columns:
+        if column.name in DERIVED_COLUMNS:
+            continue
+        value = data.get(column.name)
+        row[column.name] = text_value(value) if isinstance(column.type, sa.String) else value
+
+    row['event_type'] = event_data.get('event_type') or 'sale'
+    row['source'] = event_data.get('source')
+    row['event_date'] = event_data.get('event_date') or row['event_date'] or row.get('DateRecorded')
+    if row['raw_parcel_identification'] is None:
+        row['raw_parcel_identification'] = text_value(event_data.get('parcel_id'))
+    row['address_canonical'] = canonicalize_address(row.get('PropertyAddress'))
+    return row
+
+def assign_parcel_keys(rows):
+    """
+    Builds the synthetic STATEIDs and match keys of a batch of rows in one
+    vectorized pass from their (raw_parcel_identification, CountyName).
+    Returns the distinct, non-null STATEIDs of the batch.
+    """
+    parcel_ids = pd.Series([row['raw_parcel_identification'] for row in rows], dtype=object)
+    county_names = pd.Series([row.get('CountyName') for row in rows], dtype=object)
+    event_keys = build_event_keys(parcel_ids, county_names)
+    for row, keys in zip(rows, event_keys.to_dict('records')):
+        row.update(keys)
+    return sorted(event_keys['synthetic_stateid'].dropna().unique())
+
+def insert_events(db_connection, events_table, rows):
+    """
+    Inserts parsed events with a single multi-row INSERT, refreshes the current
+    state of the parcels they touch, links the events to their properties and
+    rescores those parcels. The caller commits.
+    """
+    synthetic_stateids = assign_parcel_keys(rows)
+    db_connection.execute(sa.insert(events_table), rows)
+    if synthetic_stateids:
+        db_connection.execute(REFRESH_CURRENT_STATE, {"synthetic_stateids": synthetic_stateids})
+        for statement in LINK_EVENTS:
+            db_connection.execute(statement, {"synthetic_stateids": synthetic_stateids})
+        db_connection.execute(SCORE_PARCELS, {"synthetic_stateids": synthetic_stateids})
+
+def flush_batch(channel, db_connection, events_table, batch):
+    """
+    Inserts a batch of parsed events in one transaction and acks every message
+    in it at once. Returns the number of events inserted.
+    - If the batch fails, its events are retried one per transaction: each is
+      acked once inserted, and one that fails on its own is rejected without
+      requeueing (dead-lettered if the queue has a dead-letter policy), so a bad
+      event cannot hold back the rest of the batch.
+    - On a connection-level error the unprocessed messages are requeued after
+      RETRY_DELAY_SECONDS.
+    """
+    def requeue_remaining(error):
+        logging.error(f"Database unavailable: {error}. Requeueing unprocessed events in {RETRY_DELAY_SECONDS} seconds...")
+        db_connection.rollback()
+        time.sleep(RETRY_DELAY_SECONDS)
+        channel.basic_nack(delivery_tag=batch[-1][0], multiple=True, requeue=True)
+
+    try:
+        insert_events(db_connection, events_table, [row for _, row in batch])
+        db_connection.commit()
+        channel.basic_ack(delivery_tag=batch[-1][0], multiple=True)
+        return len(batch)
+    except TRANSIENT_ERRORS as e:
+        requeue_remaining(e)
+        return 0
+    except Exception as e:
+        logging.warning(f"Failed to insert batch of {len(batch)} events: {e}. Retrying them one at a time.")
+        db_connection.rollback()
 
-    def callback(ch, method, properties, body):
-        """Callback function to process a message."""
+    inserted = 0
+    for delivery_tag, row in batch:
         try:
-            event_data = json.loads(body)
-            logging.info(f"Received event for parcel_id: {event_data.get('parcel_id')}")
-
-            # Prepare the insert statement
-            stmt = text("""
-                INSERT INTO property_events (parcel_id, event_type, event_date, data, source)
-                VALUES (:parcel_id, :event_type, :event_date, :data, :source)
-            """)
-            
-            # Execute the insert
-            db_connection.execute(stmt, {
-                "parcel_id": event_data.get('parcel_id'),
-                "event_type": event_data.get('event_type'),
-                "event_date": event_data.get('event_date'),
-                "data": json.dumps(event_data.get('data')), # Ensure data is a JSON string
-                "source": event_data.get('source')
-            })
-            db_connection.commit() # Commit the transaction
-
-            logging.info(f"Successfully inserted event for parcel_id: {event_data.get('parcel_id')}")
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to decode JSON message: {e}")
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False) # Discard malformed message
+            insert_events(db_connection, events_table, [row])
+            db_connection.commit()
+            channel.basic_ack(delivery_tag=delivery_tag)
+            inserted += 1
+        except TRANSIENT_ERRORS as e:
+            requeue_remaining(e)
+            break
         except Exception as e:
-            logging.error(f"An error occurred processing message: {e}")
-            # Requeue the message to be tried again later
-            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-            # A more robust solution might use a dead-letter queue.
+            logging.error(f"Rejecting event (SaleNumber {row.get('SaleNumber')}, "
+                          f"parcel {row.get('raw_parcel_identification')}): {e}")
+            db_connection.rollback()
+            channel.basic_nack(delivery_tag=delivery_tag, requeue=False)
+    return inserted
 
-    channel.basic_consume(queue=QUEUE_NAME, on_message_callback=callback)
+def run_worker():
+    """
+    Consumes messages and inserts them into the database in batches until
+    SIGTERM or SIGINT. On shutdown the worker stops consuming, flushes and acks
+    the in-flight batch, and cancels its consumer so any prefetched but
+    unprocessed messages are requeued for the remaining workers.
+    """
+    stop_requested = False
+
+    def request_stop(signum, frame):
+        nonlocal stop_requested
+        stop_requested = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def should_stop():
+        return stop_requested
+
+    # The connect loops retry until the services are up, but give up on a stop request
+    db_connection = get_db_connection(should_stop)
+    if db_connection is None:
+        logging.info("Stopped before connecting to the database.")
+        return
+    events_table = load_events_table(db_connection)
+    mq_connection, channel = setup_rabbitmq(should_stop)
+    if mq_connection is None:
+        db_connection.close()
+        logging.info("Stopped before connecting to RabbitMQ.")
+        return
+
+    batch = [] # (delivery_tag, row) tuples in delivery order
+    batch_started_at = None
+    batch_timeout = BATCH_TIMEOUT_MS / 1000
 
     try:
-        logging.info('Waiting for messages. To exit press CTRL+C')
-        channel.start_consuming()
-    except KeyboardInterrupt:
-        logging.info("Shutting down consumer...")
+        logging.info(f"Waiting for messages (batch size {BATCH_SIZE}, timeout {BATCH_TIMEOUT_MS} ms, "
+                     f"prefetch {PREFETCH_COUNT}).")
+        # inactivity_timeout makes the generator yield (None, None, None) when idle,
+        # so partially filled batches are still flushed on time and stop requests are seen.
+        for method, properties, body in channel.consume(QUEUE_NAME, inactivity_timeout=batch_timeout):
+            if method is not None:
+                try:
+                    row = parse_event(body, events_table)
+                    batch.append((method.delivery_tag, row))
+                    if batch_started_at is None:
+                        batch_started_at = time.monotonic()
+                except (ValueError, TypeError, AttributeError) as e:
+                    logging.error(f"Failed to decode message: {e}")
+                    channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False) # Discard malformed message
+
+            if batch and (stop_requested or len(batch) >= BATCH_SIZE
+                          or time.monotonic() - batch_started_at >= batch_timeout):
+                inserted = flush_batch(channel, db_connection, events_table, batch)
+                if inserted:
+                    latency_ms = (time.monotonic() - batch_started_at) * 1000
+                    logging.info(f"Inserted {inserted} of {len(batch)} events ({latency_ms:.0f} ms batch latency).")
+                batch = []
+                batch_started_at = None
+
+            if stop_requested:
+                logging.info("Shutting down consumer...")
+                break
+
+        requeued = channel.cancel()
+        if requeued:
+            logging.info(f"Requeued {requeued} prefetched messages.")
     finally:
         mq_connection.close()
         db_connection.close()
         logging.info("Connections closed.")
 
+def main(workers=WORKERS):
+    """
+    Runs `workers` consumer processes, each with its own channel and pooled
+    database connection, sharing the queue. SIGTERM/SIGINT is forwarded to
+    every worker, which drain their batches before exiting.
+    """
+    if workers <= 1:
+        run_worker()
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, name=f"worker-{worker_id}")
+        for worker_id in range(1, workers + 1)
+    ]
+
+    def forward_stop(signum, frame):
+        logging.info(f"Received signal {signum}, stopping {len(processes)} workers...")
+        for process in processes:
+            if process.is_alive():
+                process.terminate() # Delivers SIGTERM, which starts a graceful drain
+
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, forward_stop)
+    signal.signal(signal.SIGINT, forward_stop)
+
+    logging.info(f"Started {workers} consumer workers. To exit press CTRL+C")
+    for process in processes:
+        process.join()
+        logging.info(f"{process.name} exited with code {process.exitcode}.")
+
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Consume property events from RabbitMQ into the database.")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"Number of consumer processes (default: CONSUMER_WORKERS or {WORKERS}).")
+    args = parser.parse_args()
+    main(workers=args.workers)
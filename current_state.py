@@ -0,0 +1,48 @@
+from bulk_load import quote_ident
+
+# --- Configuration ---
+CURRENT_STATE_TABLE = 'parcel_current_state'
+EVENTS_TABLE = 'property_events'
+
+# Columns of the latest event copied into the per-parcel state row
+STATE_COLUMNS = [
+    'event_id', 'event_date', 'raw_parcel_identification', 'CountyName', 'PropertyAddress',
+    'PropertyType', 'TransferType', 'TotalRealEstateValue',
+    'GranteeLastName', 'GranteeFirstName', 'GranteeStreetNumber', 'GranteeAddress',
+    'GranteeCity', 'GranteeState', 'GranteeZip',
+    'TaxBillName', 'TaxBillStreetNumber', 'TaxBillAddress', 'TaxBillCity', 'TaxBillState', 'TaxBillZip',
+]
+
+# --- Current State Refresh ---
+
+def build_refresh_sql(event_filter):
+    """
+    Builds the statement that folds newly loaded events into parcel_current_state.
+    - `event_filter` is a SQL condition on `property_events` (aliased `e`) that
+      selects the events to fold in, e.g. the event_id range of a loaded chunk.
+    - The latest matching event per synthetic_stateid is picked with DISTINCT ON
+      and upserted; an existing row is only replaced by a later event (or by its
+      own event after that event was updated), so the refresh is incremental and
+      safe to run from concurrent loaders.
+    - Rows are upserted in synthetic_stateid order, so two concurrent runs of
+      this statement take their row locks in the same order. That only orders
+      locks within the statement: the locks are held until commit, so callers
+      run it once per transaction, just before committing (see
+      ingest_events.fold_loaded_events() and consumer.insert_events()).
+    The caller executes the statement with its driver's parameter style.
+    """
+    columns = ', '.join(quote_ident(col) for col in STATE_COLUMNS)
+    selected = ', '.join(f"e.{quote_ident(col)}" for col in STATE_COLUMNS)
+    updates = ',\n            '.join(f"{quote_ident(col)} = EXCLUDED.{quote_ident(col)}" for col in STATE_COLUMNS)
+    state = quote_ident(CURRENT_STATE_TABLE)
+    return f"""
+        INSERT INTO {state} (synthetic_stateid, {columns}, refreshed_at)
+        SELECT DISTINCT ON (e.synthetic_stateid) e.synthetic_stateid, {selected}, NOW()
+        FROM {quote_ident(EVENTS_TABLE)} e
+        WHERE e.synthetic_stateid IS NOT NULL AND ({event_filter})
+        ORDER BY e.synthetic_stateid, e.event_date DESC, e.event_id DESC
+        ON CONFLICT (synthetic_stateid) DO UPDATE SET
+            {updates},
+            refreshed_at = EXCLUDED.refreshed_at
+        WHERE (EXCLUDED.event_date, EXCLUDED.event_id) >= ({state}.event_date, {state}.event_id);
+    """
@@ -0,0 +1,32 @@
+# --- Configuration ---
+EVENTS_HYPERTABLE = 'property_events'
+
+# --- Chunk-at-a-time Maintenance ---
+# Backfills of property_events run one hypertable chunk per transaction, so a
+# failure only loses the current chunk and no transaction spans the whole table.
+
+def list_event_chunks(cursor):
+    """Returns (chunk name, range_start, range_end, is_compressed) for every property_events chunk, oldest first."""
+    cursor.execute(
+        """
+        SELECT chunk_schema || '.' || chunk_name, range_start, range_end, is_compressed
+        FROM timescaledb_information.chunks
+        WHERE hypertable_name = %s
+        ORDER BY range_start;
+        """,
+        (EVENTS_HYPERTABLE,)
+    )
+    return cursor.fetchall()
+
+def update_event_chunk(cursor, chunk, is_compressed, update):
+    """
+    Runs `update()` against one chunk and returns its result. A compressed
+    chunk is decompressed first and compressed again afterwards, instead of
+    updating its compressed batches row by row. The caller commits.
+    """
+    if is_compressed:
+        cursor.execute("SELECT decompress_chunk(%s::regclass, if_compressed => true);", (chunk,))
+    result = update()
+    if is_compressed:
+        cursor.execute("SELECT compress_chunk(%s::regclass, if_not_compressed => true);", (chunk,))
+    return result
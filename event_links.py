@@ -0,0 +1,78 @@
+# --- Configuration ---
+LINKS_TABLE = 'event_property_links'
+EXACT_MATCH_SCORE = 100
+
+# Exact linking strategies, in order of preference: an event linked by an earlier
+# strategy is left alone by the later ones. Each entry is (name, join condition
+# between property_events `e` and properties `p`).
+LINK_STRATEGIES = [
+    ('synthetic_stateid', 'p.synthetic_stateid = e.synthetic_stateid'),
+    ('strip_prcl', 'p."CONAME" = e."CountyName" AND p.parcel_key_stripped = e.parcel_key_stripped'),
+]
+
+# --- Event/Property Linking ---
+
+def build_link_statements(event_filter='TRUE', property_filter='TRUE'):
+    """
+    Builds the set-based statements that link events to properties, one per
+    exact strategy in LINK_STRATEGIES.
+    - `event_filter` / `property_filter` are SQL conditions on `property_events`
+      (aliased `e`) and `properties` (aliased `p`) limiting the rows considered,
+      e.g. the event_id range of a loaded chunk or a reloaded county.
+    - An event is linked to at most one property (the lowest id on ties), and
+      existing links are never replaced, so the statements can be rerun.
+    The caller executes the statements in order with its driver's parameter style.
+    """
+    return [
+        f"""
+        INSERT INTO "{LINKS_TABLE}" (event_id, event_date, property_id, synthetic_stateid, match_strategy, score)
+        SELECT DISTINCT ON (e.event_id, e.event_date)
+               e.event_id, e.event_date, p.id, p.synthetic_stateid, '{strategy}', {EXACT_MATCH_SCORE}
+        FROM property_events e
+        JOIN properties p ON {join_condition}
+        WHERE ({event_filter}) AND ({property_filter})
+        ORDER BY e.event_id, e.event_date, p.id
+        ON CONFLICT (event_id, event_date) DO NOTHING;
+        """
+        for strategy, join_condition in LINK_STRATEGIES
+    ]
+
+def link_county_properties(cursor, county=None):
+    """
+    Links events to the properties of `county` (all properties when None) after
+    a parcel reload. Returns the number of links created.
+    """
+    property_filter = 'p."CONAME" = %(county)s' if county else 'TRUE'
+    linked = 0
+    for statement in build_link_statements(property_filter=property_filter):
+        cursor.execute(statement, {'county': county.upper() if county else None})
+        linked += cursor.rowcount
+    return linked
+
+def link_fuzzy_matches(cursor, results_table='parcel_match_results', county=None):
+    """
+    Links every event with a matched orphan parcel ID to the property it was
+    matched to, from the (county, parcel ID) rows of `results_table`. Events
+    that already have an exact link keep it. Returns the number of links created.
+    - Without `county`, the fuzzy links are replaced by those in `results_table`.
+    - With `county`, only links to that county's properties are (re)created,
+      e.g. after a county reload cascade-deleted them.
+    """
+    property_filter = 'p."CONAME" = %(county)s' if county else 'TRUE'
+    if not county:
+        cursor.execute(f"""DELETE FROM "{LINKS_TABLE}" WHERE match_strategy = 'fuzzy';""")
+    cursor.execute(
+        f"""
+        INSERT INTO "{LINKS_TABLE}" (event_id, event_date, property_id, synthetic_stateid, match_strategy, score)
+        SELECT DISTINCT ON (e.event_id, e.event_date)
+               e.event_id, e.event_date, p.id, p.synthetic_stateid, 'fuzzy', r.combined_score
+        FROM "{results_table}" r
+        JOIN property_events e ON e."CountyName" = r.county_name AND e.raw_parcel_identification = r.parcel_id
+        JOIN properties p ON p.synthetic_stateid = r.matched_synthetic_stateid
+        WHERE r.matched_synthetic_stateid IS NOT NULL AND ({property_filter})
+        ORDER BY e.event_id, e.event_date, r.combined_score DESC
+        ON CONFLICT (event_id, event_date) DO NOTHING;
+        """,
+        {'county': county.upper() if county else None}
+    )
+    return cursor.rowcount
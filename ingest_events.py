@@ -5,6 +5,10 @@ import sqlalchemy as sa
 import logging
 import zipfile
 import glob
+import time
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,8 +23,19 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 
 DATA_DIR = '/app/data'
 TARGET_TABLE = 'property_events'
+MANIFEST_TABLE = 'ingest_manifest'
+CURRENT_STATE_TABLE = 'parcel_current_state'
+LINKS_TABLE = 'event_property_links'
+SALES_STATS_VIEW = 'county_monthly_sales' # Continuous aggregate over TARGET_TABLE
+EVENT_ID_SEQUENCE = 'property_events_event_id_seq' # Also the default of event_id (used by the consumer)
+CHUNK_SIZE = 100000 # Rows read, transformed and loaded at a time
 
 from ingest_geodata import ingest_geodata
+from bulk_load import load_via_staging, quote_ident, staging_table_name
+from current_state import build_refresh_sql
+from event_links import build_link_statements
+from scoring import build_score_sql
+from normalization import build_event_keys, canonicalize_addresses
 
 # --- Main Ingestion Logic ---
 
@@ -29,61 +44,41 @@ def find_csv_zip_paths():
     search_pattern_upper = os.path.join(DATA_DIR, '*CSV.zip')
     search_pattern_lower = os.path.join(DATA_DIR, '*csv.zip')
     zip_files = glob.glob(search_pattern_upper) + glob.glob(search_pattern_lower)
-    return zip_files
+    return sorted(zip_files)
 
-def ingest_events():
+def read_event_chunks(zip_path, chunksize=CHUNK_SIZE):
     """
-    Reads event data from all CSV.zip files, transforms it, and loads it
-    into the 'property_events' table in the database.
+    Yields the CSV inside a RETR zip archive as DataFrames of at most `chunksize` rows.
+    Only one chunk is held in memory at a time.
     """
-    logging.info("Starting raw event data ingestion...")
-
-    csv_zip_paths = find_csv_zip_paths()
-    if not csv_zip_paths:
-        logging.error(f"No '*CSV.zip' or '*csv.zip' files found in {DATA_DIR}")
-        return
-
-    logging.info(f"Found {len(csv_zip_paths)} CSV zip files for ingestion.")
-
-    all_dfs = []
-    for zip_path in csv_zip_paths:
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as z:
-                csv_filename = next((f for f in z.namelist() if f.lower().endswith('.csv')), None)
-                if not csv_filename:
-                    logging.warning(f"No CSV file found inside {zip_path}. Skipping.")
-                    continue
-            
-                logging.info(f"Reading CSV file: {zip_path}/{csv_filename}")
-                with z.open(csv_filename) as f:
-                    df = pd.read_csv(f, low_memory=False, encoding='latin-1')
-                    all_dfs.append(df)
-
-        except Exception as e:
-            logging.error(f"Failed to read or process CSV file {zip_path}: {e}")
-            continue
-
-    if not all_dfs:
-        logging.error("No dataframes were successfully read. Exiting.")
-        return
+    with zipfile.ZipFile(zip_path, 'r') as z:
+        csv_filename = next((f for f in z.namelist() if f.lower().endswith('.csv')), None)
+        if not csv_filename:
+            logging.warning(f"No CSV file found inside {zip_path}. Skipping.")
+            return
 
-    # Concatenate all dataframes
-    full_df = pd.concat(all_dfs, ignore_index=True)
-    logging.info(f"Successfully read {len(full_df)} total rows from all CSVs.")
+        logging.info(f"Reading CSV file: {zip_path}/{csv_filename}")
+        with z.open(csv_filename) as f:
+            # Read every column as text so identifiers keep their source formatting in every chunk
+            for chunk in pd.read_csv(f, dtype=str, encoding='latin-1', chunksize=chunksize):
+                yield chunk
 
-    # --- Data Transformation ---
-    full_df.rename(columns={'ParcelIdentification': 'raw_parcel_identification', 'DeedDate': 'event_date'}, inplace=True)
+def transform_events(df, first_event_id):
+    """
+    Applies the column renames, type coercion and event date fallback to a chunk
+    of raw RETR rows, and numbers the surviving rows from `first_event_id`.
+    """
+    df = df.rename(columns={'ParcelIdentification': 'raw_parcel_identification', 'DeedDate': 'event_date'})
 
     # Drop the 'Unnamed: 89' column if it exists
-    if 'Unnamed: 89' in full_df.columns:
-        full_df.drop(columns=['Unnamed: 89'], inplace=True)
-        logging.info("Dropped 'Unnamed: 89' column.")
+    if 'Unnamed: 89' in df.columns:
+        df = df.drop(columns=['Unnamed: 89'])
 
     # Convert date columns
     date_cols = ['DateRecorded', 'DateConveyed', 'event_date', 'CertificationDate', 'GranteeCertificationDate']
     for col in date_cols:
-        if col in full_df.columns:
-            full_df[col] = pd.to_datetime(full_df[col], errors='coerce')
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
 
     # Convert numeric columns
     numeric_cols = [
@@ -92,45 +87,380 @@ def ingest_events():
         'PersPropertyValueExempt', 'TotalRealEstateValue', 'TransferFee'
     ]
     for col in numeric_cols:
-        if col in full_df.columns:
-            full_df[col] = pd.to_numeric(full_df[col], errors='coerce')
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Integer columns must be written without a trailing '.0' for COPY
+    integer_cols = ['YearCaptured', 'MultiFamilyUnits']
+    for col in integer_cols:
+        if col in df.columns:
+            df[col] = df[col].round().astype('Int64')
 
     # --- Handle Missing Event Dates ---
-    full_df['event_date'] = pd.to_datetime(full_df['event_date'], errors='coerce')
-    full_df['DateRecorded'] = pd.to_datetime(full_df['DateRecorded'], errors='coerce')
-    full_df['event_date'].fillna(full_df['DateRecorded'], inplace=True)
-    full_df.dropna(subset=['event_date'], inplace=True)
+    df['event_date'] = pd.to_datetime(df['event_date'], errors='coerce')
+    df['DateRecorded'] = pd.to_datetime(df['DateRecorded'], errors='coerce')
+    df['event_date'] = df['event_date'].fillna(df['DateRecorded'])
+    df = df.dropna(subset=['event_date'])
 
     # Add event_type and source columns
-    full_df['event_type'] = 'sale'
-    full_df['source'] = 'RETR_CSV'
+    df['event_type'] = 'sale'
+    df['source'] = 'RETR_CSV'
+
+    # synthetic_stateid (same key as properties, used to maintain parcel_current_state)
+    # and the match keys joined against properties (see scripts/find_property_matches.py)
+    event_keys = build_event_keys(df['raw_parcel_identification'], df['CountyName'])
+    df[event_keys.columns] = event_keys
+    df['address_canonical'] = canonicalize_addresses(df['PropertyAddress'])
+
+    # Number events consecutively across chunks so event_id stays globally unique
+    df['event_id'] = range(first_event_id, first_event_id + len(df))
+    return df
+
+def count_csv_lines(zip_path):
+    """
+    Counts newline characters in the CSV inside a RETR zip archive.
+    The count is an upper bound on the number of records (header and quoted
+    embedded newlines only add to it), which makes it safe for reserving event_id ranges.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as z:
+        csv_filename = next((f for f in z.namelist() if f.lower().endswith('.csv')), None)
+        if not csv_filename:
+            return 0
+        line_count = 0
+        with z.open(csv_filename) as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                line_count += block.count(b'\n')
+        return line_count + 1
+
+def archive_fingerprint(zip_path):
+    """Returns (file_size, sha256 hex digest) of an archive, reading it in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(zip_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return os.path.getsize(zip_path), digest.hexdigest()
+
+def record_manifest(cursor, zip_path, fingerprint, row_count):
+    """Upserts the manifest entry for an archive inside the loading transaction."""
+    file_size, content_sha256 = fingerprint
+    cursor.execute(
+        f"""
+        INSERT INTO "{MANIFEST_TABLE}" (archive_name, file_size, content_sha256, row_count, loaded_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON CONFLICT (archive_name) DO UPDATE SET
+            file_size = EXCLUDED.file_size,
+            content_sha256 = EXCLUDED.content_sha256,
+            row_count = EXCLUDED.row_count,
+            loaded_at = EXCLUDED.loaded_at;
+        """,
+        (os.path.basename(zip_path), file_size, content_sha256, row_count)
+    )
+
+# --- Incremental Updates ---
+# Incremental loads match events on their natural key (SaleNumber, DocumentNumber).
+# Events without a SaleNumber are matched on FALLBACK_KEY instead; they are only
+# ever inserted if absent, never updated, since the key covers what could change.
+# The key is not enforced unique (a unique index on the compressed hypertable
+# would have to be part of its segmentby/orderby), and the NOT EXISTS check only
+# sees events other loads have committed, so two archives loading concurrently
+# could insert the same sale twice: incremental archives are loaded one at a time.
+
+NATURAL_KEY = ['SaleNumber', 'DocumentNumber']
+FALLBACK_KEY = ['DocumentNumber', 'CountyName', 'raw_parcel_identification', 'event_date']
+
+def drop_chunk_duplicates(df):
+    """Keeps the last occurrence of each event within a chunk, by NATURAL_KEY or, without a SaleNumber, FALLBACK_KEY."""
+    keep = ~df.duplicated(subset=NATURAL_KEY, keep='last')
+    no_sale = df['SaleNumber'].isna()
+    keep[no_sale] = ~df[no_sale].duplicated(subset=FALLBACK_KEY, keep='last')
+    return df[keep]
+
+def update_changed_events(cursor, columns):
+    """
+    Overwrites the existing events whose natural key matches a staged row of the
+    current chunk and whose values differ from it. event_id and event_date are
+    kept: links and parcel_current_state refer to them, and event_date partitions
+    the hypertable. Returns the event_ids of the updated events.
+    """
+    updated_columns = [col for col in columns if col not in ('event_id', 'event_date', 'SaleNumber', 'DocumentNumber')]
+    assignments = ', '.join(f"{quote_ident(col)} = staged.{quote_ident(col)}" for col in updated_columns)
+    existing_values = ', '.join(f"e.{quote_ident(col)}" for col in updated_columns)
+    staged_values = ', '.join(f"staged.{quote_ident(col)}" for col in updated_columns)
+    cursor.execute(
+        f"""
+        UPDATE "{TARGET_TABLE}" e SET {assignments}
+        FROM {staging_table_name(TARGET_TABLE)} staged
+        WHERE e."SaleNumber" = staged."SaleNumber"
+          AND e."DocumentNumber" IS NOT DISTINCT FROM staged."DocumentNumber"
+          AND ({existing_values}) IS DISTINCT FROM ({staged_values})
+        RETURNING e.event_id;
+        """
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+# --- Folding Loaded Events ---
+# Each archive load folds its events into parcel_current_state, event_property_links
+# and parcel_scores once, after its last chunk. Each of those upserts takes its row
+# locks in key order, but only within one statement; running one statement of each
+# per transaction, right before the commit, keeps concurrent loaders and consumer
+# batches from deadlocking or waiting on each other for a whole archive.
+
+def fold_loaded_events(cursor, first_event_id, last_event_id, updated_event_ids=()):
+    """
+    Refreshes parcel_current_state, the exact links and the scores of the events
+    inserted with ids in [first_event_id, last_event_id] and of the existing
+    events updated in place (`updated_event_ids`). Returns the number of state
+    rows refreshed.
+    """
+    params = {'first_event_id': first_event_id, 'last_event_id': last_event_id,
+              'updated_event_ids': list(updated_event_ids)}
+    event_filter = "(e.event_id BETWEEN %(first_event_id)s AND %(last_event_id)s OR e.event_id = ANY(%(updated_event_ids)s))"
+    if updated_event_ids:
+        # The parcel keys may have changed; the exact links are rebuilt from them
+        cursor.execute(
+            f"""DELETE FROM "{LINKS_TABLE}" WHERE event_id = ANY(%(updated_event_ids)s) AND match_strategy <> 'fuzzy';""",
+            params
+        )
+    cursor.execute(build_refresh_sql(event_filter), params)
+    refreshed = cursor.rowcount
+    for statement in build_link_statements(event_filter):
+        cursor.execute(statement, params)
+    cursor.execute(
+        build_score_sql(f"""p.synthetic_stateid IN (SELECT e.synthetic_stateid FROM "{TARGET_TABLE}" e WHERE {event_filter})"""),
+        params
+    )
+    return refreshed
+
+# --- Archive Loading ---
+
+def load_archive(zip_path, first_event_id, last_event_id, chunksize=CHUNK_SIZE, fingerprint=None, incremental=False):
+    """
+    Reads, transforms and bulk loads a single RETR archive in its own transaction.
+    - Events are numbered within the reserved range [first_event_id, last_event_id].
+    - Opens its own database connection so it can run inside a worker process.
+    - In incremental mode, events whose natural key (SaleNumber, DocumentNumber)
+      is already present are not inserted again; those whose values changed are
+      updated in place. Events without a SaleNumber are skipped when an event
+      with the same FALLBACK_KEY exists. Reloading a modified archive is idempotent.
+    - After the last chunk, the archive's events are folded into
+      parcel_current_state, linked to their properties in event_property_links
+      and their parcels rescored, once (see fold_loaded_events()).
+    - The archive's manifest entry is written in the same transaction as its events.
+    - Returns (zip_path, rows_loaded, elapsed_seconds).
+    """
+    insert_suffix = ''
+    if incremental:
+        fallback_match = ' AND '.join(
+            f'existing.{quote_ident(col)} IS NOT DISTINCT FROM staged.{quote_ident(col)}' for col in FALLBACK_KEY
+        )
+        insert_suffix = f"""
+            WHERE NOT EXISTS (
+                SELECT 1 FROM "{TARGET_TABLE}" existing
+                WHERE existing."SaleNumber" = staged."SaleNumber"
+                  AND existing."DocumentNumber" IS NOT DISTINCT FROM staged."DocumentNumber"
+            )
+            AND NOT (staged."SaleNumber" IS NULL AND EXISTS (
+                SELECT 1 FROM "{TARGET_TABLE}" existing
+                WHERE existing.event_date = staged.event_date AND existing."SaleNumber" IS NULL
+                  AND {fallback_match}
+            ))
+        """
+
+    start_time = time.perf_counter()
+    engine = create_engine(DATABASE_URL)
+    next_event_id = first_event_id
+    archive_rows = 0
+    updated_event_ids = []
+
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            for chunk in read_event_chunks(zip_path, chunksize):
+                chunk_first_event_id = next_event_id
+                df = transform_events(chunk, chunk_first_event_id)
+                next_event_id += len(df)
+                if next_event_id - 1 > last_event_id:
+                    raise ValueError(f"{zip_path} exceeded its reserved event_id range ending at {last_event_id}")
+                if incremental:
+                    df = drop_chunk_duplicates(df)
+                archive_rows += load_via_staging(cursor, df, TARGET_TABLE, insert_suffix)
+                if incremental:
+                    updated_event_ids.extend(update_changed_events(cursor, df.columns))
+            # Skipped duplicates leave gaps in the range; only inserted events are folded in
+            fold_loaded_events(cursor, first_event_id, next_event_id - 1, updated_event_ids)
+            if fingerprint:
+                record_manifest(cursor, zip_path, fingerprint, archive_rows)
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+        engine.dispose()
+
+    if updated_event_ids:
+        logging.info(f"Updated {len(updated_event_ids)} changed events from {zip_path}.")
+    return zip_path, archive_rows, time.perf_counter() - start_time
+
+def assign_event_id_ranges(csv_zip_paths, line_counts, first_event_id=1):
+    """Reserves a non-overlapping, consecutive event_id range for each archive."""
+    ranges = {}
+    next_event_id = first_event_id
+    for zip_path, line_count in zip(csv_zip_paths, line_counts):
+        ranges[zip_path] = (next_event_id, next_event_id + line_count - 1)
+        next_event_id += line_count
+    return ranges
+
+def reserve_event_ids(count):
+    """
+    Reserves `count` consecutive event_ids from the event_id sequence and
+    returns the first one. The table lock waits for in-flight inserts and holds
+    back new ones (the consumer's ids come from the column default), so no
+    event_id in the range can be handed out to anyone else.
+    """
+    engine = create_engine(DATABASE_URL)
+    try:
+        with engine.begin() as connection:
+            connection.execute(sa.text(f'LOCK TABLE "{TARGET_TABLE}" IN SHARE ROW EXCLUSIVE MODE;'))
+            last_event_id = connection.execute(
+                sa.text(f"SELECT setval('{EVENT_ID_SEQUENCE}', nextval('{EVENT_ID_SEQUENCE}') + :count - 1);"),
+                {'count': count}
+            ).scalar()
+    finally:
+        engine.dispose()
+    return last_event_id - count + 1
+
+def select_changed_archives(connection, csv_zip_paths, fingerprints):
+    """Returns the archives whose name is not in the manifest or whose content hash changed."""
+    result = connection.execute(sa.text(f'SELECT archive_name, content_sha256 FROM "{MANIFEST_TABLE}";'))
+    loaded_hashes = {row.archive_name: row.content_sha256 for row in result}
+    return [
+        zip_path for zip_path in csv_zip_paths
+        if loaded_hashes.get(os.path.basename(zip_path)) != fingerprints[zip_path][1]
+    ]
+
+def ingest_events(chunksize=CHUNK_SIZE, workers=1, incremental=False):
+    """
+    Streams event data from all CSV.zip files into the 'property_events' table.
+    Each archive is read, transformed and loaded `chunksize` rows at a time, so
+    peak memory depends on the chunk size rather than on the number of archives.
+    With `workers` > 1, archives are loaded end to end by a pool of processes,
+    each within an event_id range this coordinator reserves up front from the
+    event_id sequence the consumer also draws from.
+    With `incremental`, existing events are kept, archives already recorded in
+    the manifest with the same content hash are skipped, new events are appended
+    and changed ones updated. Incremental archives are loaded one at a time
+    regardless of `workers` (see update_changed_events()).
+    """
+    logging.info("Starting raw event data ingestion...")
+
+    csv_zip_paths = find_csv_zip_paths()
+    if not csv_zip_paths:
+        logging.error(f"No '*CSV.zip' or '*csv.zip' files found in {DATA_DIR}")
+        return
+
+    logging.info(f"Found {len(csv_zip_paths)} CSV zip files for ingestion.")
 
-    # Generate a simple event_id for each unique event
-    full_df['event_id'] = range(1, len(full_df) + 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        fingerprints = dict(zip(csv_zip_paths, executor.map(archive_fingerprint, csv_zip_paths)))
 
-    # --- Database Loading ---
     try:
         logging.info(f"Connecting to database at {DB_HOST}...")
         engine = create_engine(DATABASE_URL)
 
-        logging.info(f"Clearing all existing data from '{TARGET_TABLE}' table...")
         with engine.connect() as connection:
-            connection.execute(sa.text(f'TRUNCATE TABLE "{TARGET_TABLE}" RESTART IDENTITY CASCADE;'))
-            connection.commit()
-
-        logging.info(f"Loading data into '{TARGET_TABLE}' table...")
-        full_df.to_sql(
-            TARGET_TABLE,
-            engine,
-            if_exists='append',
-            index=False,
-            chunksize=1000,
-            dtype={'event_date': sa.DateTime(timezone=True)}
-        )
-        logging.info(f"Successfully loaded {len(full_df)} records into '{TARGET_TABLE}'.")
+            if incremental:
+                csv_zip_paths = select_changed_archives(connection, csv_zip_paths, fingerprints)
+                logging.info(f"Incremental mode: {len(csv_zip_paths)} new or changed archive(s) to load.")
+            else:
+                logging.info(f"Clearing all existing data from '{TARGET_TABLE}', '{MANIFEST_TABLE}', "
+                             f"'{CURRENT_STATE_TABLE}' and '{LINKS_TABLE}' tables...")
+                # RESTART IDENTITY also restarts EVENT_ID_SEQUENCE, which event_id owns
+                connection.execute(sa.text(
+                    f'TRUNCATE TABLE "{TARGET_TABLE}", "{MANIFEST_TABLE}", "{CURRENT_STATE_TABLE}", "{LINKS_TABLE}" '
+                    f'RESTART IDENTITY CASCADE;'
+                ))
+                connection.commit()
+        engine.dispose()
+    except Exception as e:
+        logging.error(f"Failed to prepare the database: {e}")
+        return
+
+    if not csv_zip_paths:
+        logging.info("All archives are already loaded. Nothing to do.")
+        return
+
+    # --- Streaming Load ---
+    load_workers = workers
+    if incremental and workers > 1:
+        logging.info("Incremental mode loads archives one at a time; --workers only applies to hashing and line counts.")
+        load_workers = 1
+    logging.info(f"Bulk loading data into '{TARGET_TABLE}' table via COPY in chunks of {chunksize} rows "
+                 f"using {load_workers} worker(s)...")
+    start_time = time.perf_counter()
+    total_rows = 0
+    failed_paths = []
 
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        line_counts = list(executor.map(count_csv_lines, csv_zip_paths))
+    try:
+        first_event_id = reserve_event_ids(sum(line_counts))
+    except Exception as e:
+        logging.error(f"Failed to reserve event_ids: {e}")
+        return
+    event_id_ranges = assign_event_id_ranges(csv_zip_paths, line_counts, first_event_id)
+    logging.info(f"Reserved event_ids {first_event_id} to {first_event_id + sum(line_counts) - 1}.")
+
+    with ProcessPoolExecutor(max_workers=load_workers) as executor:
+        futures = {
+            executor.submit(load_archive, zip_path, first_id, last_id, chunksize,
+                            fingerprints[zip_path], incremental): zip_path
+            for zip_path, (first_id, last_id) in event_id_ranges.items()
+        }
+        for future in as_completed(futures):
+            zip_path = futures[future]
+            try:
+                _, archive_rows, elapsed = future.result()
+                total_rows += archive_rows
+                logging.info(f"Loaded {archive_rows} records from {zip_path} in {elapsed:.1f}s "
+                             f"({archive_rows / max(elapsed, 1e-9):,.0f} rows/sec).")
+            except Exception as e:
+                failed_paths.append(zip_path)
+                logging.error(f"Failed to load {zip_path} into the database: {e}")
+
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Successfully loaded {total_rows} records into '{TARGET_TABLE}'.")
+    logging.info(f"Load took {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} rows/sec).")
+    if failed_paths:
+        logging.warning(f"{len(failed_paths)} archive(s) failed to load: {failed_paths}")
+
+    if total_rows:
+        refresh_sales_stats()
+
+def refresh_sales_stats():
+    """
+    Materializes the monthly sales statistics right after a load instead of
+    waiting for the aggregate's hourly refresh policy. Only the months touched
+    by the loaded events are recomputed.
+    """
+    logging.info(f"Refreshing '{SALES_STATS_VIEW}'...")
+    try:
+        engine = create_engine(DATABASE_URL)
+        # refresh_continuous_aggregate() cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(sa.text(f"CALL refresh_continuous_aggregate('{SALES_STATS_VIEW}', NULL, NULL);"))
+        engine.dispose()
     except Exception as e:
-        logging.error(f"Failed to load data into the database: {e}")
+        logging.error(f"Failed to refresh '{SALES_STATS_VIEW}': {e}")
 
 if __name__ == "__main__":
-    ingest_events()
+    parser = argparse.ArgumentParser(description="Load RETR event archives into the property_events table.")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                        help=f"Rows read and loaded per chunk (default: {CHUNK_SIZE}).")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes loading archives in parallel (default: 1).")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Load only archives that are new or changed since the last run instead of reloading "
+                             "everything. Archives are then loaded one at a time.")
+    args = parser.parse_args()
+    ingest_events(chunksize=args.chunksize, workers=args.workers, incremental=args.incremental)
@@ -1,9 +1,20 @@
 import os
+import itertools
+import fiona
 import geopandas as gpd
 import pandas as pd
+import shapely
 from sqlalchemy import create_engine
 import sqlalchemy as sa
 import logging
+import argparse
+import time
+
+from normalization import build_synthetic_stateids, build_property_parcel_keys, build_property_addresses
+from bulk_load import load_via_staging
+from tile_cache import clear_tiles, invalidate_bbox
+from event_links import link_county_properties, link_fuzzy_matches
+from scoring import score_county_properties
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,6 +30,19 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 DATA_DIR = '/app/data'
 TARGET_TABLE = 'properties'
 TARGET_CRS = 'EPSG:4326' # WGS 84
+TARGET_SRID = 4326
+CHUNK_SIZE = 100000 # Features read, reprojected and loaded at a time
+
+# Secondary indexes dropped before a full reload and rebuilt once after it.
+# The synthetic_stateid unique constraint is kept because the load relies on it.
+DEFERRED_INDEXES = {
+    'ix_properties_synthetic_stateid': f'CREATE INDEX IF NOT EXISTS ix_properties_synthetic_stateid ON "{TARGET_TABLE}" (synthetic_stateid);',
+    'ix_properties_geom': f'CREATE INDEX IF NOT EXISTS ix_properties_geom ON "{TARGET_TABLE}" USING GIST (geom);',
+    'ix_properties_coname_id': f'CREATE INDEX IF NOT EXISTS ix_properties_coname_id ON "{TARGET_TABLE}" ("CONAME", id);',
+    'ix_properties_address_canonical_trgm': f'CREATE INDEX IF NOT EXISTS ix_properties_address_canonical_trgm ON "{TARGET_TABLE}" USING GIN (address_canonical gin_trgm_ops);',
+    'ix_properties_coname_parcel_key_stripped': f'CREATE INDEX IF NOT EXISTS ix_properties_coname_parcel_key_stripped ON "{TARGET_TABLE}" ("CONAME", parcel_key_stripped);',
+    'ix_properties_coname_parcel_key_normalized': f'CREATE INDEX IF NOT EXISTS ix_properties_coname_parcel_key_normalized ON "{TARGET_TABLE}" ("CONAME", parcel_key_normalized);',
+}
 
 # --- Main Ingestion Logic ---
 
@@ -30,52 +54,43 @@ def find_gdb_path():
         return None
     return statewide_gdb_dir
 
-def create_synthetic_stateid(row):
+def read_parcel_chunks(gdb_path, chunksize=CHUNK_SIZE, county=None):
     """
-    Creates a synthetic STATEID from PARCELFIPS and PARCELID.
-    - Normalizes PARCELID by removing non-alphanumeric characters.
-    - Zero-pads PARCELFIPS to 3 digits.
-    - Combines them to create a consistent, joinable key.
+    Yields the parcel layer as GeoDataFrames of at most `chunksize` features.
+    The layer is opened once and read sequentially, so only one chunk is held
+    in memory and no feature is read twice.
+    With `county`, the layer is filtered on CONAME by the GDAL driver and the
+    rest of the state is never materialized.
     """
-    parcel_id = row.get('PARCELID')
-    fips_code = row.get('PARCELFIPS')
+    with fiona.open(gdb_path) as collection:
+        if county:
+            escaped_county = county.upper().replace("'", "''")
+            features = collection.filter(where=f"CONAME = '{escaped_county}'")
+        else:
+            features = iter(collection)
 
-    if pd.isna(parcel_id) or pd.isna(fips_code):
-        return None
+        offset = 0
+        while True:
+            batch = list(itertools.islice(features, chunksize))
+            if not batch:
+                return
+            gdf = gpd.GeoDataFrame.from_features(batch, crs=collection.crs_wkt)
+            logging.info(f"Read features {offset} to {offset + len(gdf) - 1} (CRS: {gdf.crs}).")
+            yield gdf
+            offset += len(batch)
 
-    # Normalize parcel_id: remove all non-alphanumeric characters
-    normalized_parcel_id = ''.join(filter(str.isalnum, str(parcel_id))).upper()
-    
-    # Format FIPS code to be a zero-padded 3-digit string
-    formatted_fips = str(int(fips_code)).zfill(3)
-    
-    return f"{formatted_fips}{normalized_parcel_id}"
+def write_log_csv(df, path, written_paths):
+    """Writes rows to a diagnostic CSV, appending after the first chunk of this run."""
+    first_write = path not in written_paths
+    df.to_csv(path, mode='w' if first_write else 'a', header=first_write, index=False)
+    written_paths.add(path)
 
-def ingest_geodata():
+def transform_parcels(gdf, written_paths):
     """
-    Reads geospatial data from a GDB directory, transforms it, and loads it
-    into the 'properties' table in the PostGIS-enabled database.
+    Applies type conversion, synthetic_stateid, match key and canonical address
+    creation, duplicate removal and reprojection to a chunk of parcel features.
     """
-    logging.info("Starting statewide geospatial data ingestion...")
-
-    gdb_path = find_gdb_path()
-    if not gdb_path:
-        return
-
-    logging.info(f"Found statewide GDB directory: {gdb_path}")
-
-    try:
-        logging.info(f"Reading geodata from: {gdb_path}")
-        gdf = gpd.read_file(gdb_path)
-        logging.info(f"Successfully read {len(gdf)} features.")
-        logging.info(f"Original CRS: {gdf.crs}")
-
-    except Exception as e:
-        logging.error(f"Failed to read geodatabase directory: {e}")
-        return
-
-    # --- Data Transformation ---
-    gdf.rename(columns={'geometry': 'geom'}, inplace=True)
+    gdf = gdf.rename(columns={'geometry': 'geom'})
     gdf = gdf.set_geometry('geom')
 
     # --- Data Type Conversion ---
@@ -91,66 +106,174 @@ def ingest_geodata():
             gdf[col] = pd.to_numeric(gdf[col], errors='coerce')
 
     # --- Synthetic STATEID Creation ---
-    logging.info("Creating synthetic_stateid...")
-    gdf['synthetic_stateid'] = gdf.apply(create_synthetic_stateid, axis=1)
-    logging.info("Finished creating synthetic_stateid.")
-    
+    gdf['synthetic_stateid'] = build_synthetic_stateids(gdf['PARCELID'], gdf['PARCELFIPS'])
+    gdf['parcel_key_stripped'], gdf['parcel_key_normalized'] = build_property_parcel_keys(gdf['PARCELID'])
+    gdf['address_canonical'] = build_property_addresses(gdf)
+
     # Log records where synthetic_stateid is null
     null_synthetic_ids = gdf[gdf['synthetic_stateid'].isnull()]
     if not null_synthetic_ids.empty:
         logging.warning(f"Found {len(null_synthetic_ids)} records with null synthetic_stateid.")
         null_ids_log_path = os.path.join(DATA_DIR, 'null_synthetic_ids_geodata.csv')
-        logging.info(f"Logging details of null synthetic_stateids to {null_ids_log_path}")
-        null_synthetic_ids[['PARCELID', 'PARCELFIPS']].to_csv(null_ids_log_path, index=False)
-
-    # --- Handle Duplicates based on synthetic_stateid ---
-    if 'synthetic_stateid' in gdf.columns:
-        duplicates = gdf[gdf.duplicated(subset=['synthetic_stateid'], keep=False)]
-        if not duplicates.empty:
-            logging.warning(f"Found {len(duplicates)} duplicated rows based on 'synthetic_stateid'.")
-            
-            log_cols = ['synthetic_stateid', 'STATEID', 'PARCELID', 'TAXPARCELID', 'PARCELDATE', 'TAXROLLYEAR', 'OWNERNME1']
-            cols_to_log = [col for col in log_cols if col in duplicates.columns]
-            
-            duplicates_log_path = os.path.join(DATA_DIR, 'duplicates_synthetic_stateid.csv')
-            logging.info(f"Logging details of duplicates to {duplicates_log_path}")
-            duplicates[cols_to_log].to_csv(duplicates_log_path, index=False)
-
-            initial_rows = len(gdf)
-            gdf.drop_duplicates(subset=['synthetic_stateid'], keep='first', inplace=True)
-            final_rows = len(gdf)
-            logging.info(f"Removed {initial_rows - final_rows} duplicate records. {final_rows} unique records remain.")
-        else:
-            logging.info("No duplicate synthetic_stateids found.")
+        write_log_csv(null_synthetic_ids[['PARCELID', 'PARCELFIPS']], null_ids_log_path, written_paths)
+
+    # --- Handle Duplicates based on synthetic_stateid within the chunk ---
+    duplicates = gdf[gdf.duplicated(subset=['synthetic_stateid'], keep=False)]
+    if not duplicates.empty:
+        logging.warning(f"Found {len(duplicates)} duplicated rows based on 'synthetic_stateid'.")
+
+        log_cols = ['synthetic_stateid', 'STATEID', 'PARCELID', 'TAXPARCELID', 'PARCELDATE', 'TAXROLLYEAR', 'OWNERNME1']
+        cols_to_log = [col for col in log_cols if col in duplicates.columns]
+
+        duplicates_log_path = os.path.join(DATA_DIR, 'duplicates_synthetic_stateid.csv')
+        write_log_csv(duplicates[cols_to_log], duplicates_log_path, written_paths)
+
+        initial_rows = len(gdf)
+        gdf = gdf.drop_duplicates(subset=['synthetic_stateid'], keep='first')
+        logging.info(f"Removed {initial_rows - len(gdf)} duplicate records. {len(gdf)} unique records remain.")
 
     # --- CRS Transformation ---
     if gdf.crs != TARGET_CRS:
-        logging.info(f"Reprojecting data from {gdf.crs} to {TARGET_CRS}...")
         gdf = gdf.to_crs(TARGET_CRS)
 
-    # --- Database Loading ---
+    return gdf
+
+def to_copy_frame(gdf):
+    """
+    Converts a GeoDataFrame into a plain DataFrame ready for COPY, with the
+    geometry encoded as hex EWKB carrying SRID 4326 so PostGIS can parse it directly.
+    """
+    df = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    geometries = shapely.set_srid(gdf.geometry.to_numpy(), TARGET_SRID)
+    df['geom'] = shapely.to_wkb(geometries, hex=True, include_srid=True)
+    return df
+
+def load_parcels(cursor, gdf):
+    """
+    Loads a chunk of parcels through COPY and a staging table. Features whose
+    synthetic_stateid is already present (loaded by an earlier chunk) are skipped
+    by the unique constraint, keeping the first occurrence statewide.
+    Returns the number of rows inserted.
+    """
+    df = to_copy_frame(gdf)
+    inserted_rows = load_via_staging(cursor, df, TARGET_TABLE, 'ON CONFLICT (synthetic_stateid) DO NOTHING')
+    if inserted_rows < len(df):
+        logging.warning(f"Skipped {len(df) - inserted_rows} records whose synthetic_stateid was loaded by an earlier chunk.")
+    return inserted_rows
+
+def county_extent(connection, county):
+    """Returns the (min_lon, min_lat, max_lon, max_lat) extent of a county's loaded parcels, or None."""
+    row = connection.execute(
+        sa.text(
+            f'SELECT ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent) '
+            f'FROM (SELECT ST_Extent(geom) AS extent FROM "{TARGET_TABLE}" WHERE "CONAME" = :county) AS county_extent;'
+        ),
+        {'county': county.upper()}
+    ).one()
+    return None if row[0] is None else tuple(row)
+
+def invalidate_tiles(engine, county=None, previous_extent=None):
+    """
+    Drops the cached map tiles made stale by a reload.
+    - After a statewide load the whole tile cache is cleared.
+    - After a county load only the tiles covering the county's previous and
+      new extents are removed.
+    """
+    if not county:
+        clear_tiles()
+        return
+    with engine.connect() as connection:
+        extents = [previous_extent, county_extent(connection, county)]
+    for extent in extents:
+        if extent:
+            invalidate_bbox(*extent)
+
+def ingest_geodata(chunksize=CHUNK_SIZE, county=None):
+    """
+    Reads geospatial data from a GDB directory chunk by chunk, transforms each
+    chunk, and loads it into the 'properties' table in the PostGIS-enabled database.
+    Peak memory is bounded by `chunksize` rather than by the size of the state.
+    With `county`, only that county's parcels are read and replaced.
+    Events are then linked to the reloaded parcels in event_property_links (the
+    old links go with the replaced rows): exact links first, then the fuzzy
+    matches stored in parcel_match_results. Cached map tiles covering the
+    parcels are invalidated.
+    """
+    scope = f"county {county.upper()}" if county else "statewide"
+    logging.info(f"Starting {scope} geospatial data ingestion...")
+
+    gdb_path = find_gdb_path()
+    if not gdb_path:
+        return
+
+    logging.info(f"Found statewide GDB directory: {gdb_path}")
+
     try:
         logging.info(f"Connecting to database at {DB_HOST}...")
         engine = create_engine(DATABASE_URL)
 
-        logging.info(f"Clearing all existing data from '{TARGET_TABLE}' table...")
         with engine.connect() as connection:
-            connection.execute(sa.text(f'TRUNCATE TABLE "{TARGET_TABLE}" RESTART IDENTITY CASCADE;'))
+            previous_extent = None
+            if county:
+                previous_extent = county_extent(connection, county)
+                logging.info(f"Clearing existing {county.upper()} records from '{TARGET_TABLE}' table...")
+                connection.execute(sa.text(f'DELETE FROM "{TARGET_TABLE}" WHERE "CONAME" = :county;'),
+                                   {'county': county.upper()})
+            else:
+                logging.info(f"Clearing all existing data from '{TARGET_TABLE}' table...")
+                connection.execute(sa.text(f'TRUNCATE TABLE "{TARGET_TABLE}" RESTART IDENTITY CASCADE;'))
+                # Build secondary indexes once after the load instead of maintaining them per row
+                for index_name in DEFERRED_INDEXES:
+                    connection.execute(sa.text(f'DROP INDEX IF EXISTS "{index_name}";'))
             connection.commit()
 
-        logging.info(f"Loading data into '{TARGET_TABLE}' table...")
-        gdf.to_postgis(
-            TARGET_TABLE,
-            engine,
-            if_exists='append',
-            index=False,
-            chunksize=1000
-        )
-        logging.info(f"Successfully loaded {len(gdf)} records into '{TARGET_TABLE}'.")
+        logging.info(f"Bulk loading data into '{TARGET_TABLE}' table via COPY in chunks of {chunksize} features...")
+        start_time = time.perf_counter()
+        written_paths = set()
+        total_rows = 0
+        raw_connection = engine.raw_connection()
+        try:
+            with raw_connection.cursor() as cursor:
+                for chunk in read_parcel_chunks(gdb_path, chunksize, county):
+                    gdf = transform_parcels(chunk, written_paths)
+                    total_rows += load_parcels(cursor, gdf)
+                    raw_connection.commit()
+                    logging.info(f"Loaded {total_rows} records so far.")
+        finally:
+            if not county:
+                # Rebuild even after a failed chunk so the table is never left without its indexes
+                raw_connection.rollback()
+                logging.info("Rebuilding deferred indexes...")
+                with raw_connection.cursor() as cursor:
+                    for create_sql in DEFERRED_INDEXES.values():
+                        cursor.execute(create_sql)
+                raw_connection.commit()
+            raw_connection.close()
+            invalidate_tiles(engine, county, previous_extent)
+        elapsed = time.perf_counter() - start_time
+
+        logging.info(f"Successfully loaded {total_rows} records into '{TARGET_TABLE}'.")
+        logging.info(f"Load took {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):,.0f} features/sec).")
+
+        logging.info("Linking events to the loaded parcels and scoring them...")
+        raw_connection = engine.raw_connection()
+        try:
+            with raw_connection.cursor() as cursor:
+                linked = link_county_properties(cursor, county)
+                fuzzy_linked = link_fuzzy_matches(cursor, county=county)
+                scored = score_county_properties(cursor, county)
+            raw_connection.commit()
+        finally:
+            raw_connection.close()
+        logging.info(f"Created {linked} exact and {fuzzy_linked} fuzzy event links and scored {scored} parcels.")
 
     except Exception as e:
         logging.error(f"Failed to load data into the database: {e}")
 
 if __name__ == "__main__":
-    ingest_geodata()
-
+    parser = argparse.ArgumentParser(description="Load the statewide parcel GDB into the properties table.")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE,
+                        help=f"Features read and loaded per chunk (default: {CHUNK_SIZE}).")
+    parser.add_argument('--county', help="Only load (and replace) the parcels of this county, e.g. VILAS.")
+    args = parser.parse_args()
+    ingest_geodata(chunksize=args.chunksize, county=args.county)
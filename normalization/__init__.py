@@ -0,0 +1,27 @@
+from .address import (
+    build_property_addresses,
+    canonicalize_address,
+    canonicalize_addresses,
+    compose_site_addresses,
+)
+from .county_map import (
+    COUNTY_STRATEGIES,
+    DEFAULT_STRATEGIES,
+    WI_COUNTY_FIPS,
+    normalize_county_names,
+    strategies_for_county,
+)
+from .normalize import (
+    apply_strategies,
+    build_event_keys,
+    build_property_parcel_keys,
+    build_synthetic_stateids,
+    county_fips_codes,
+    format_fips_codes,
+    join_stateid_parts,
+    normalize_event_parcel_ids,
+    normalize_parcel_ids,
+    strip_parcel_ids,
+    strip_prcl_prefix,
+)
+from .strategies import STRATEGIES
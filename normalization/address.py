@@ -0,0 +1,148 @@
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# --- Address Vocabulary ---
+# USPS Publication 28 abbreviations for the street address line.
+
+STREET_SUFFIXES = {
+    'ALLEY': 'ALY', 'AVENUE': 'AVE', 'AV': 'AVE', 'BAY': 'BAY', 'BEACH': 'BCH', 'BEND': 'BND',
+    'BLUFF': 'BLF', 'BOULEVARD': 'BLVD', 'BRANCH': 'BR', 'BRIDGE': 'BRG', 'CIRCLE': 'CIR',
+    'COURT': 'CT', 'COVE': 'CV', 'CREEK': 'CRK', 'CROSSING': 'XING', 'DRIVE': 'DR', 'ESTATES': 'ESTS',
+    'EXPRESSWAY': 'EXPY', 'FOREST': 'FRST', 'GLEN': 'GLN', 'GROVE': 'GRV', 'HARBOR': 'HBR',
+    'HEIGHTS': 'HTS', 'HILL': 'HL', 'HILLS': 'HLS', 'HOLLOW': 'HOLW', 'ISLAND': 'IS', 'JUNCTION': 'JCT',
+    'KNOLL': 'KNL', 'LAKE': 'LK', 'LAKES': 'LKS', 'LANDING': 'LNDG', 'LANE': 'LN', 'LOOP': 'LOOP',
+    'MEADOW': 'MDW', 'MEADOWS': 'MDWS', 'ORCHARD': 'ORCH', 'PARK': 'PARK', 'PARKWAY': 'PKWY',
+    'PASS': 'PASS', 'PATH': 'PATH', 'PIKE': 'PIKE', 'PINES': 'PNES', 'PLACE': 'PL', 'PLAZA': 'PLZ',
+    'POINT': 'PT', 'PRAIRIE': 'PR', 'RIDGE': 'RDG', 'ROAD': 'RD', 'ROUTE': 'RTE', 'RUN': 'RUN',
+    'SHORE': 'SHR', 'SHORES': 'SHRS', 'SPRINGS': 'SPGS', 'SQUARE': 'SQ', 'STREET': 'ST', 'STR': 'ST',
+    'TERRACE': 'TER', 'TRACE': 'TRCE', 'TRAIL': 'TRL', 'VALLEY': 'VLY', 'VIEW': 'VW', 'VILLAGE': 'VLG',
+    'VISTA': 'VIS', 'WAY': 'WAY', 'WOODS': 'WDS',
+}
+DIRECTIONALS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW',
+}
+UNIT_DESIGNATORS = {
+    'APARTMENT': 'APT', 'BUILDING': 'BLDG', 'FLOOR': 'FL', 'LOT': 'LOT', 'ROOM': 'RM', 'SPACE': 'SPC',
+    'SUITE': 'STE', 'TRAILER': 'TRLR', 'UNIT': 'UNIT', '#': '#',
+}
+# Words abbreviated wherever they appear, and WI highway shorthands
+ABBREVIATIONS = {'HIGHWAY': 'HWY', 'HIGHWY': 'HWY', 'HWAY': 'HWY', 'COUNTY': 'CO', 'CNTY': 'CO', 'CTY': 'CO'}
+HIGHWAY_SHORTHANDS = {'CTH': ['CO', 'HWY'], 'STH': ['STATE', 'HWY'], 'USH': ['US', 'HWY']}
+# County roads are county highways: 'COUNTY ROAD K' and 'CTH K' both -> 'CO HWY K'
+COUNTY_ROAD_WORDS = {'ROAD', 'RD'}
+
+def with_abbreviations(mapping):
+    """Adds each abbreviation as a key of its own, so already abbreviated tokens map to themselves."""
+    return {**{value: value for value in mapping.values()}, **mapping}
+
+SUFFIX_FORMS = with_abbreviations(STREET_SUFFIXES)
+DIRECTIONAL_FORMS = with_abbreviations(DIRECTIONALS)
+UNIT_FORMS = with_abbreviations(UNIT_DESIGNATORS)
+
+DROPPED_CHARACTERS = re.compile(r"[.'`]") # "N.E." -> "NE", "O'NEIL" -> "ONEIL"
+SEPARATOR_CHARACTERS = re.compile(r'[^A-Z0-9#/ ]+')
+FRACTION_PATTERN = re.compile(r'[0-9]+/[0-9]+')
+CANONICAL_CACHE_SIZE = 1 << 18
+
+# --- Canonicalization ---
+
+@lru_cache(maxsize=CANONICAL_CACHE_SIZE)
+def canonicalize_address(address):
+    """
+    Returns the canonical form of a street address line, e.g.
+    '123 North Main Street, Apartment 2' -> '123 N MAIN ST APT 2'.
+    - Uppercases, drops periods/apostrophes and turns other punctuation into spaces.
+    - Splits off a unit (APT, STE, LOT, #, ...) and everything after it; only
+      after the street name, so '100 SUITE AVE' keeps its street.
+    - Abbreviates the pre-directional, street suffix and post-directional by
+      position, so a street named e.g. 'NORTH ST' keeps its name.
+    - Expands the WI highway shorthands CTH/STH/USH ('CTH K' -> 'CO HWY K') and
+      writes county roads as county highways ('COUNTY ROAD K' -> 'CO HWY K').
+    Returns None for missing or blank addresses. Memoized per process.
+    """
+    if not isinstance(address, str):
+        return None
+    text = SEPARATOR_CHARACTERS.sub(' ', DROPPED_CHARACTERS.sub('', address.upper()).replace('#', ' # '))
+    tokens = []
+    for token in text.split():
+        if token in COUNTY_ROAD_WORDS and tokens and tokens[-1] == 'CO':
+            token = 'HWY'
+        tokens.extend(HIGHWAY_SHORTHANDS.get(token, [ABBREVIATIONS.get(token, token)]))
+    if not tokens:
+        return None
+
+    number = []
+    if any(char.isdigit() for char in tokens[0]) and len(tokens) > 1:
+        number, tokens = tokens[:1], tokens[1:]
+        if len(tokens) > 1 and FRACTION_PATTERN.fullmatch(tokens[0]):
+            number, tokens = number + tokens[:1], tokens[1:]
+
+    # Unit designator: needs a street word before it; a trailing designator without an id is dropped
+    unit = []
+    for position in range(1, len(tokens)):
+        if tokens[position] in UNIT_FORMS:
+            unit_id = tokens[position + 1:]
+            if unit_id:
+                unit = [UNIT_FORMS[tokens[position]], *unit_id]
+            tokens = tokens[:position]
+            break
+
+    # Peel directionals and the suffix off the street name, never consuming its last word
+    pre_directional, suffix, post_directional = [], [], []
+    if len(tokens) > 1 and tokens[-1] in DIRECTIONAL_FORMS:
+        post_directional, tokens = [DIRECTIONAL_FORMS[tokens[-1]]], tokens[:-1]
+    if len(tokens) > 1 and tokens[-1] in SUFFIX_FORMS:
+        suffix, tokens = [SUFFIX_FORMS[tokens[-1]]], tokens[:-1]
+    if len(tokens) > 1 and tokens[0] in DIRECTIONAL_FORMS:
+        pre_directional, tokens = [DIRECTIONAL_FORMS[tokens[0]]], tokens[1:]
+
+    return ' '.join(number + pre_directional + tokens + suffix + post_directional + unit)
+
+def canonicalize_addresses(addresses):
+    """
+    Canonicalizes a Series of street address lines with canonicalize_address().
+    Each distinct address is canonicalized once and broadcast back to every row
+    holding it. Missing values stay None.
+    """
+    codes, uniques = pd.factorize(addresses)
+    if len(uniques) == 0:
+        return pd.Series([None] * len(addresses), index=addresses.index, dtype=object)
+
+    canonical = pd.Series([canonicalize_address(value) for value in uniques], dtype=object)
+    values = canonical.to_numpy(dtype=object)[codes]
+    values[codes < 0] = None
+    return pd.Series(values, index=addresses.index, dtype=object)
+
+# Parcel address components of the V11 schema, in address order; the number
+# parts (e.g. 'N' + '1234' + 'A') are written without spaces between them.
+ADDRESS_NUMBER_COLUMNS = ['ADDNUMPREFIX', 'ADDNUM', 'ADDNUMSUFFIX']
+ADDRESS_STREET_COLUMNS = ['PREFIX', 'STREETNAME', 'STREETTYPE', 'SUFFIX', 'UNITTYPE', 'UNITID']
+
+def address_component(parcels, col):
+    """Returns a trimmed address component column as strings; '' where missing or absent."""
+    if col not in parcels.columns:
+        return pd.Series('', index=parcels.index)
+    return parcels[col].fillna('').astype(str).str.strip()
+
+def compose_site_addresses(parcels):
+    """Builds address lines from a parcel frame's address component columns; '' when none are set."""
+    composed = address_component(parcels, ADDRESS_NUMBER_COLUMNS[0])
+    for col in ADDRESS_NUMBER_COLUMNS[1:]:
+        composed = composed + address_component(parcels, col)
+    for col in ADDRESS_STREET_COLUMNS:
+        composed = composed + ' ' + address_component(parcels, col)
+    return composed.str.strip()
+
+def build_property_addresses(parcels):
+    """
+    Canonical site addresses of a parcel frame: SITEADRESS, or the address
+    composed from the V11 component columns (ADDNUM, STREETNAME, ...) where
+    SITEADRESS is blank.
+    """
+    site_addresses = parcels['SITEADRESS'].astype(object)
+    has_site_address = site_addresses.notna() & (site_addresses.astype(str).str.strip() != '')
+    composed = compose_site_addresses(parcels)
+    return canonicalize_addresses(site_addresses.where(has_site_address, composed.where(composed != '')))
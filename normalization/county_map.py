@@ -0,0 +1,37 @@
+# --- Per-County Strategy Dispatch ---
+# RETR parcel IDs are normalized by an ordered pipeline of strategies (see
+# strategies/). Counties whose IDs need a different treatment are listed in
+# COUNTY_STRATEGIES by their normalized name; all others use DEFAULT_STRATEGIES.
+# Changing a county's pipeline changes its event keys, so reload its events after.
+
+DEFAULT_STRATEGIES = ('default', 'strip_prcl_fips', 'universal_alphanumeric')
+COUNTY_STRATEGIES = {}
+
+def strategies_for_county(county_name):
+    """Returns the strategy pipeline of a county, given its normalized name (or None)."""
+    return COUNTY_STRATEGIES.get(county_name, DEFAULT_STRATEGIES)
+
+# --- County FIPS Codes ---
+# Wisconsin county FIPS codes (the PARCELFIPS values of the statewide parcel layer),
+# keyed by county name as normalized by normalize_county_names().
+WI_COUNTY_FIPS = {
+    'ADAMS': 1, 'ASHLAND': 3, 'BARRON': 5, 'BAYFIELD': 7, 'BROWN': 9, 'BUFFALO': 11,
+    'BURNETT': 13, 'CALUMET': 15, 'CHIPPEWA': 17, 'CLARK': 19, 'COLUMBIA': 21, 'CRAWFORD': 23,
+    'DANE': 25, 'DODGE': 27, 'DOOR': 29, 'DOUGLAS': 31, 'DUNN': 33, 'EAU CLAIRE': 35,
+    'FLORENCE': 37, 'FOND DU LAC': 39, 'FOREST': 41, 'GRANT': 43, 'GREEN': 45, 'GREEN LAKE': 47,
+    'IOWA': 49, 'IRON': 51, 'JACKSON': 53, 'JEFFERSON': 55, 'JUNEAU': 57, 'KENOSHA': 59,
+    'KEWAUNEE': 61, 'LA CROSSE': 63, 'LAFAYETTE': 65, 'LANGLADE': 67, 'LINCOLN': 69, 'MANITOWOC': 71,
+    'MARATHON': 73, 'MARINETTE': 75, 'MARQUETTE': 77, 'MENOMINEE': 78, 'MILWAUKEE': 79, 'MONROE': 81,
+    'OCONTO': 83, 'ONEIDA': 85, 'OUTAGAMIE': 87, 'OZAUKEE': 89, 'PEPIN': 91, 'PIERCE': 93,
+    'POLK': 95, 'PORTAGE': 97, 'PRICE': 99, 'RACINE': 101, 'RICHLAND': 103, 'ROCK': 105,
+    'RUSK': 107, 'ST CROIX': 109, 'SAUK': 111, 'SAWYER': 113, 'SHAWANO': 115, 'SHEBOYGAN': 117,
+    'TAYLOR': 119, 'TREMPEALEAU': 121, 'VERNON': 123, 'VILAS': 125, 'WALWORTH': 127, 'WASHBURN': 129,
+    'WASHINGTON': 131, 'WAUKESHA': 133, 'WAUPACA': 135, 'WAUSHARA': 137, 'WINNEBAGO': 139, 'WOOD': 141,
+}
+
+def normalize_county_names(county_names):
+    """Uppercases county names, drops periods and collapses whitespace ('St. Croix' -> 'ST CROIX')."""
+    return (county_names.astype(str).str.upper()
+            .str.replace('.', '', regex=False)
+            .str.split().str.join(' ')
+            .astype(object).where(county_names.notna(), None))
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from .county_map import DEFAULT_STRATEGIES, WI_COUNTY_FIPS, normalize_county_names, strategies_for_county
+from .strategies import STRATEGIES
+
+# --- Strategy Pipelines ---
+
+def apply_strategies(parcel_ids, strategy_names):
+    """
+    Runs an ordered pipeline of named strategies over a Series of parcel IDs.
+    - Each distinct ID is normalized once and the result is broadcast back to
+      every row holding it, since RETR repeats a parcel across many sales.
+    - Missing values stay None.
+    """
+    codes, uniques = pd.factorize(parcel_ids)
+    if len(uniques) == 0:
+        return pd.Series([None] * len(parcel_ids), index=parcel_ids.index, dtype=object)
+
+    normalized = pd.Series(uniques, dtype=object).astype(str)
+    for name in strategy_names:
+        normalized = STRATEGIES[name](normalized)
+
+    values = normalized.to_numpy(dtype=object)[codes]
+    values[codes < 0] = None
+    return pd.Series(values, index=parcel_ids.index, dtype=object)
+
+def normalize_parcel_ids(parcel_ids):
+    """
+    Normalizes a Series of parcel IDs by removing all non-alphanumeric characters
+    and uppercasing the result. Missing values stay None.
+    """
+    return apply_strategies(parcel_ids, ('universal_alphanumeric',))
+
+def strip_parcel_ids(parcel_ids):
+    """Trims and uppercases a Series of parcel IDs. Missing values stay None."""
+    return apply_strategies(parcel_ids, ('default',))
+
+def strip_prcl_prefix(parcel_ids):
+    """Uppercases and trims RETR parcel IDs and removes a leading 'PRCL###-' prefix."""
+    return apply_strategies(parcel_ids, ('default', 'strip_prcl_fips'))
+
+def normalize_event_parcel_ids(raw_parcel_ids, county_names):
+    """
+    Normalizes RETR parcel IDs with the strategy pipeline of each row's county
+    (see county_map.py). Rows are grouped by pipeline, so each pipeline runs
+    once over all of its counties' rows.
+    """
+    normalized_counties = normalize_county_names(county_names)
+    counties_by_pipeline = {}
+    for county in normalized_counties.dropna().unique():
+        counties_by_pipeline.setdefault(tuple(strategies_for_county(county)), []).append(county)
+
+    # Every row starts from the default pipeline, including rows without a county
+    normalized = apply_strategies(raw_parcel_ids, DEFAULT_STRATEGIES)
+    for pipeline, counties in counties_by_pipeline.items():
+        if pipeline != tuple(DEFAULT_STRATEGIES):
+            rows = normalized_counties.isin(counties)
+            normalized[rows] = apply_strategies(raw_parcel_ids[rows], pipeline)
+    return normalized
+
+# --- Synthetic STATEIDs ---
+
+def format_fips_codes(fips_codes):
+    """
+    Formats a Series of county FIPS codes as zero-padded 3-digit strings.
+    Values that are missing or not numeric become None.
+    """
+    if pd.api.types.is_numeric_dtype(fips_codes):
+        numeric = fips_codes
+    else:
+        numeric = pd.to_numeric(fips_codes.astype(str).str.strip(), errors='coerce')
+    integral = pd.Series(np.trunc(numeric.astype(float)), index=fips_codes.index).astype('Int64')
+    formatted = integral.astype(str).str.zfill(3)
+    return formatted.astype(object).where(integral.notna(), None)
+
+def county_fips_codes(county_names):
+    """Maps a Series of county names to zero-padded 3-digit FIPS codes; unknown names become None."""
+    return format_fips_codes(normalize_county_names(county_names).map(WI_COUNTY_FIPS))
+
+def join_stateid_parts(formatted_fips, normalized_ids):
+    """Concatenates FIPS codes and normalized IDs; None when either part is missing."""
+    combined = formatted_fips.str.cat(normalized_ids)
+    return combined.astype(object).where(normalized_ids.notna() & formatted_fips.notna(), None)
+
+def build_synthetic_stateids(parcel_ids, fips_codes):
+    """
+    Creates synthetic STATEIDs from parallel Series of parcel IDs and FIPS codes.
+    - Normalizes the parcel ID with normalize_parcel_ids().
+    - Zero-pads the FIPS code to 3 digits.
+    - Combines them to create a consistent, joinable key; None when either part is missing.
+    """
+    return join_stateid_parts(format_fips_codes(fips_codes), normalize_parcel_ids(parcel_ids))
+
+# --- Match Keys ---
+# Keys stored on both properties and property_events so each matching strategy is
+# a plain indexed equality join in the database:
+# - parcel_key_stripped: trimmed, uppercased ID ("strip PRCL only" for events)
+# - parcel_key_normalized: alphanumeric-only ID ("universal normalization")
+
+def build_property_parcel_keys(parcel_ids):
+    """Returns (parcel_key_stripped, parcel_key_normalized) for a Series of property PARCELIDs."""
+    return strip_parcel_ids(parcel_ids), normalize_parcel_ids(parcel_ids)
+
+def build_event_keys(raw_parcel_ids, county_names):
+    """
+    Builds every key of a batch of RETR events in one pass over the distinct IDs.
+    Returns a DataFrame aligned with the input with the columns:
+    - synthetic_stateid: county FIPS code followed by the county-normalized ID,
+      joinable with properties.synthetic_stateid
+    - parcel_key_stripped: trimmed, uppercased ID with a leading 'PRCL' dropped
+    - parcel_key_normalized: the county-normalized ID
+    """
+    normalized = normalize_event_parcel_ids(raw_parcel_ids, county_names)
+    return pd.DataFrame({
+        'synthetic_stateid': join_stateid_parts(county_fips_codes(county_names), normalized),
+        'parcel_key_stripped': apply_strategies(raw_parcel_ids, ('default', 'strip_prcl')),
+        'parcel_key_normalized': normalized,
+    }, index=raw_parcel_ids.index)
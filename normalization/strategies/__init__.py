@@ -0,0 +1,11 @@
+from . import default, strip_prcl, strip_prcl_fips, universal_alphanumeric
+
+# --- Strategy Registry ---
+# Each strategy is a vectorized function from a Series of non-null parcel ID
+# strings to a Series of the same length. Pipelines refer to strategies by name.
+STRATEGIES = {
+    'default': default.apply,
+    'strip_prcl': strip_prcl.apply,
+    'strip_prcl_fips': strip_prcl_fips.apply,
+    'universal_alphanumeric': universal_alphanumeric.apply,
+}
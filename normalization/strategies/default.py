@@ -0,0 +1,3 @@
+def apply(parcel_ids):
+    """Trims and uppercases a Series of parcel ID strings."""
+    return parcel_ids.str.strip().str.upper()
@@ -0,0 +1,3 @@
+def apply(parcel_ids):
+    """Removes a leading 'PRCL' from a Series of trimmed, uppercased parcel ID strings."""
+    return parcel_ids.where(~parcel_ids.str.startswith('PRCL'), parcel_ids.str[4:])
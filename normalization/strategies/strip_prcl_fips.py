@@ -0,0 +1,5 @@
+PRCL_PREFIX_PATTERN = r'^PRCL[0-9]{3}-'
+
+def apply(parcel_ids):
+    """Removes a leading 'PRCL###-' from a Series of trimmed, uppercased parcel ID strings."""
+    return parcel_ids.str.replace(PRCL_PREFIX_PATTERN, '', regex=True)
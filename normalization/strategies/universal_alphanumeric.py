@@ -0,0 +1,9 @@
+NON_ALPHANUMERIC_PATTERN = r'[\W_]+' # Matches everything str.isalnum() rejects
+
+def apply(parcel_ids):
+    """
+    Removes all non-alphanumeric characters from a Series of parcel ID strings
+    and uppercases the result.
+    Equivalent to ''.join(filter(str.isalnum, value)).upper() per element.
+    """
+    return parcel_ids.str.replace(NON_ALPHANUMERIC_PATTERN, '', regex=True).str.upper()
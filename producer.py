@@ -5,6 +5,10 @@ import json
 import logging
 import zipfile
 import glob
+import argparse
+import numpy as np
+
+from checkpoints import read_checkpoint, write_checkpoint
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,53 +21,191 @@ RABBITMQ_URL = f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}/"
 EXCHANGE_NAME = 'property_events_exchange'
 QUEUE_NAME = 'property_events_queue'
 ROUTING_KEY = 'property.event.sale'
+# Messages published per AMQP transaction; the broker confirms each window with one round-trip
+PUBLISH_WINDOW = int(os.getenv('PRODUCER_PUBLISH_WINDOW', '1000'))
+
+CHUNK_SIZE = int(os.getenv('PRODUCER_CHUNK_SIZE', '100000')) # CSV rows read and published at a time
 
 DATA_DIR = '/app/data'
+CHECKPOINT_PATH = os.path.join(DATA_DIR, 'producer_checkpoint.json')
+
+# RETR columns that fill the message's top-level fields. The 'data' payload
+# keeps the RETR column names, which the consumer maps onto property_events.
+COLUMN_MAPPING = {
+    'ParcelIdentification': 'parcel_id',
+    'DeedDate': 'event_date',
+}
+REQUIRED_COLS = list(COLUMN_MAPPING)
+# Used when DeedDate is missing, as in ingest_events.transform_events()
+EVENT_DATE_FALLBACK = 'DateRecorded'
 
 # --- Main Producer Logic ---
 
-def find_csv_zip_path():
-    """Finds the first file ending with 'CSV.zip' in the data directory."""
-    search_pattern = os.path.join(DATA_DIR, '*CSV.zip')
-    zip_files = glob.glob(search_pattern)
-    if not zip_files:
-        logging.error(f"No '*CSV.zip' file found in {DATA_DIR}")
-        return None
-    if len(zip_files) > 1:
-        logging.warning(f"Multiple CSV.zip files found. Using the first one: {zip_files[0]}")
-    return zip_files[0]
-
-def publish_events():
+def build_messages(df):
     """
-    Reads property event data from a CSV.zip file and publishes each event
-    to a RabbitMQ exchange.
+    Serializes every row of a RETR DataFrame into an event message body.
+    - parcel_id and event_date come from the COLUMN_MAPPING columns; a missing
+      or unparseable DeedDate falls back to DateRecorded. Dates are parsed once
+      for the whole column; rows with neither date are skipped and counted.
+    - The full-row 'data' payloads, under the RETR column names, are encoded in
+      bulk by DataFrame.to_json.
+    Returns (messages, row_positions): the JSON strings in row order and, for each
+    message, the position of its source row within `df`.
     """
-    logging.info("Starting event producer...")
+    fields = {field: column for column, field in COLUMN_MAPPING.items()}
+    event_dates = pd.to_datetime(df[fields['event_date']], errors='coerce')
+    if EVENT_DATE_FALLBACK in df.columns:
+        event_dates = event_dates.fillna(pd.to_datetime(df[EVENT_DATE_FALLBACK], errors='coerce'))
+    invalid_dates = event_dates.isna()
+    row_positions = np.flatnonzero(~invalid_dates.to_numpy())
+    if invalid_dates.any():
+        logging.warning(f"Skipping {int(invalid_dates.sum())} rows with no parseable "
+                        f"{fields['event_date']} or {EVENT_DATE_FALLBACK}.")
+        df = df[~invalid_dates]
+        event_dates = event_dates[~invalid_dates]
+
+    # One JSON document per line; NaN becomes null
+    data_payloads = df.to_json(orient='records', lines=True, date_format='iso',
+                               double_precision=15, default_handler=str).splitlines()
+    parcel_column = df[fields['parcel_id']]
+    parcel_ids = [
+        json.dumps(parcel_id, default=str)
+        for parcel_id in parcel_column.astype(object).where(parcel_column.notna(), None)
+    ]
+    event_date_strings = event_dates.dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+
+    messages = [
+        f'{{"parcel_id": {parcel_id}, "event_type": "sale", "event_date": "{event_date}", '
+        f'"source": "RETR_CSV", "data": {data}}}'
+        for parcel_id, event_date, data in zip(parcel_ids, event_date_strings, data_payloads)
+    ]
+    return messages, row_positions
+
+def publish_messages(channel, messages, on_window_committed=None):
+    """
+    Publishes message bodies in windows of PUBLISH_WINDOW. Each window is an AMQP
+    transaction, so the broker has accepted every message in it once tx_commit
+    returns, at the cost of one round-trip per window rather than per message.
+    `on_window_committed(published_count)` is called after every committed window.
+    Returns the number of messages published.
+    """
+    message_properties = pika.BasicProperties(delivery_mode=2) # make message persistent
 
-    csv_zip_path = find_csv_zip_path()
-    if not csv_zip_path:
-        return
+    published_count = 0
+    for start in range(0, len(messages), PUBLISH_WINDOW):
+        for message_body in messages[start:start + PUBLISH_WINDOW]:
+            channel.basic_publish(
+                exchange=EXCHANGE_NAME,
+                routing_key=ROUTING_KEY,
+                body=message_body,
+                properties=message_properties)
+        channel.tx_commit()
+        published_count += len(messages[start:start + PUBLISH_WINDOW])
+        if on_window_committed:
+            on_window_committed(published_count)
 
-    logging.info(f"Found CSV zip file: {csv_zip_path}")
+    return published_count
 
-    try:
-        # Pandas can read directly from a zip archive
-        with zipfile.ZipFile(csv_zip_path, 'r') as z:
-            # Find the first CSV file in the zip archive
-            csv_filename = next((f for f in z.namelist() if f.lower().endswith('.csv')), None)
-            if not csv_filename:
-                logging.error(f"No CSV file found inside {csv_zip_path}")
-                return
-            
-            logging.info(f"Reading CSV file: {csv_filename}")
-            with z.open(csv_filename) as f:
-                df = pd.read_csv(f, low_memory=False, encoding='latin-1')
-
-        logging.info(f"Successfully read {len(df)} rows from the CSV.")
-        logging.info(f"Original columns: {df.columns.tolist()}")
+def load_checkpoint():
+    """Returns the saved progress as {archive name: {'row_offset': int, 'complete': bool}}."""
+    return read_checkpoint(CHECKPOINT_PATH) or {}
 
-    except Exception as e:
-        logging.error(f"Failed to read or process CSV file: {e}")
+def save_checkpoint(checkpoint):
+    write_checkpoint(CHECKPOINT_PATH, checkpoint)
+
+def read_csv_chunks(zip_path, row_offset=0, chunksize=CHUNK_SIZE):
+    """
+    Yields the CSV inside a RETR zip archive in chunks of `chunksize` rows,
+    skipping the first `row_offset` records.
+    The skipped records are parsed and discarded rather than passed to
+    skiprows, which counts physical lines: a quoted field with an embedded
+    newline would shift every resumed offset after it.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as z:
+        # Find the first CSV file in the zip archive
+        csv_filename = next((f for f in z.namelist() if f.lower().endswith('.csv')), None)
+        if not csv_filename:
+            logging.error(f"No CSV file found inside {zip_path}")
+            return
+
+        logging.info(f"Reading CSV file: {zip_path}/{csv_filename} from row {row_offset}")
+        rows_to_skip = row_offset
+        with z.open(csv_filename) as f:
+            # Read every column as text, as ingest_events does, so identifiers keep
+            # their leading zeros and the same type in every chunk
+            for chunk in pd.read_csv(f, dtype=str, encoding='latin-1', chunksize=chunksize):
+                if rows_to_skip >= len(chunk):
+                    rows_to_skip -= len(chunk)
+                    continue
+                if rows_to_skip:
+                    chunk = chunk.iloc[rows_to_skip:]
+                    rows_to_skip = 0
+                yield chunk
+
+def find_csv_zip_paths():
+    """Finds all files ending with 'CSV.zip' or 'csv.zip' in the data directory, oldest month first."""
+    search_pattern_upper = os.path.join(DATA_DIR, '*CSV.zip')
+    search_pattern_lower = os.path.join(DATA_DIR, '*csv.zip')
+    zip_files = glob.glob(search_pattern_upper) + glob.glob(search_pattern_lower)
+    return sorted(zip_files)
+
+def publish_archive(channel, zip_path, checkpoint):
+    """
+    Streams one archive to RabbitMQ chunk by chunk, recording the CSV row offset
+    reached in `checkpoint` after every committed publish window.
+    Returns the number of messages published.
+    """
+    archive_name = os.path.basename(zip_path)
+    progress = checkpoint.setdefault(archive_name, {'row_offset': 0, 'complete': False})
+    published_total = 0
+
+    for chunk in read_csv_chunks(zip_path, progress['row_offset']):
+        if not all(col in chunk.columns for col in REQUIRED_COLS):
+            logging.error(f"Missing one or more required RETR columns: {REQUIRED_COLS}")
+            logging.error(f"Available columns: {chunk.columns.tolist()}")
+            return published_total
+
+        chunk_start_offset = progress['row_offset']
+        messages, row_positions = build_messages(chunk)
+
+        def record_progress(published_count):
+            # Everything up to the source row of the last committed message is done
+            progress['row_offset'] = chunk_start_offset + int(row_positions[published_count - 1]) + 1
+            save_checkpoint(checkpoint)
+
+        published_total += publish_messages(channel, messages, record_progress)
+        progress['row_offset'] = chunk_start_offset + len(chunk)
+        save_checkpoint(checkpoint)
+        logging.info(f"Published {published_total} events from {archive_name} (row {progress['row_offset']}).")
+
+    progress['complete'] = True
+    save_checkpoint(checkpoint)
+    return published_total
+
+def publish_events(reset=False):
+    """
+    Streams property event data from every CSV.zip file and publishes each event
+    to a RabbitMQ exchange. Progress is checkpointed as (archive, row offset), so
+    a restarted run resumes where the last one stopped instead of republishing.
+    """
+    logging.info("Starting event producer...")
+
+    csv_zip_paths = find_csv_zip_paths()
+    if not csv_zip_paths:
+        logging.error(f"No '*CSV.zip' or '*csv.zip' files found in {DATA_DIR}")
+        return
+
+    if reset and os.path.exists(CHECKPOINT_PATH):
+        logging.info(f"Discarding checkpoint {CHECKPOINT_PATH}.")
+        os.remove(CHECKPOINT_PATH)
+    checkpoint = load_checkpoint()
+
+    pending_paths = [
+        path for path in csv_zip_paths
+        if not checkpoint.get(os.path.basename(path), {}).get('complete')
+    ]
+    logging.info(f"Found {len(csv_zip_paths)} CSV zip files, {len(pending_paths)} still to publish.")
+    if not pending_paths:
         return
 
     # --- RabbitMQ Connection Setup ---
@@ -78,6 +220,8 @@ def publish_events():
         channel.queue_declare(queue=QUEUE_NAME, durable=True)
         # Bind the queue to the exchange with the routing key
         channel.queue_bind(exchange=EXCHANGE_NAME, queue=QUEUE_NAME, routing_key=ROUTING_KEY)
+        # Publish in transactions so each window is confirmed with one round-trip
+        channel.tx_select()
 
         logging.info("Successfully connected to RabbitMQ and declared exchange/queue.")
 
@@ -86,63 +230,23 @@ def publish_events():
         return
 
     # --- Data Transformation & Publishing ---
-    # This section will likely need adjustment based on the actual CSV schema.
-    # Making assumptions for now.
-    column_mapping = {
-        'PropertyID': 'parcel_id',
-        'DocumentDate': 'event_date',
-    }
-    
-    # Rename columns for consistency
-    df_renamed = df.rename(columns=column_mapping)
-
-    required_cols = ['parcel_id', 'event_date']
-    if not all(col in df_renamed.columns for col in required_cols):
-        logging.error(f"Missing one or more required columns after mapping: {required_cols}")
-        logging.error(f"Available columns: {df_renamed.columns.tolist()}")
-        return
-
-    # Convert all columns to a dictionary-friendly format
-    # Replace NaN with None for clean JSON conversion
-    df_renamed = df_renamed.where(pd.notnull(df_renamed), None)
-    
-    logging.info("Starting to publish events...")
     published_count = 0
-    for index, row in df_renamed.iterrows():
-        try:
-            # Convert the entire row to a dictionary for the 'data' payload
-            row_data = row.to_dict()
-
-            # Construct the event message
-            event_data = {
-                'parcel_id': row['parcel_id'],
-                'event_type': 'sale', # Hardcoded for now
-                'event_date': pd.to_datetime(row['event_date']).isoformat(),
-                'source': 'RETR_CSV',
-                'data': row_data # Include the full row data
-            }
-
-            message_body = json.dumps(event_data, default=str) # Use default=str to handle any non-serializable types
-
-            # Publish the message
-            channel.basic_publish(
-                exchange=EXCHANGE_NAME,
-                routing_key=ROUTING_KEY,
-                body=message_body,
-                properties=pika.BasicProperties(
-                    delivery_mode=2,  # make message persistent
-                ))
-            published_count += 1
-            if published_count % 1000 == 0:
-                 logging.info(f"Published {published_count} events...")
-
-        except Exception as e:
-            logging.warning(f"Failed to process or publish row {index}: {e}")
-            logging.warning(f"Row data: {row.to_dict()}")
+    try:
+        for zip_path in pending_paths:
+            published_count += publish_archive(channel, zip_path, checkpoint)
+    except pika.exceptions.AMQPError as e:
+        logging.error(f"Failed to publish events: {e}. Re-run to resume from {CHECKPOINT_PATH}.")
+    except Exception as e:
+        logging.error(f"Failed to read or process CSV file: {e}. Re-run to resume from {CHECKPOINT_PATH}.")
 
     # --- Cleanup ---
-    connection.close()
+    if connection.is_open:
+        connection.close()
     logging.info(f"Finished publishing. Total events published: {published_count}")
 
 if __name__ == "__main__":
-    publish_events()
+    parser = argparse.ArgumentParser(description="Publish RETR events from every monthly archive to RabbitMQ.")
+    parser.add_argument('--reset', action='store_true',
+                        help="Ignore the saved checkpoint and publish every archive from the beginning.")
+    args = parser.parse_args()
+    publish_events(reset=args.reset)
@@ -0,0 +1,275 @@
+import os
+import json
+import gzip
+import logging
+import argparse
+import itertools
+import time
+
+import psycopg2
+import psycopg2.extras
+
+from checkpoints import read_checkpoint, write_checkpoint
+
+# --- Configuration ---
+# Database connection details from environment variables
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+EXPORT_DIR = os.getenv('RAG_EXPORT_DIR', '/app/data/rag')
+FETCH_SIZE = 5000 # Rows pulled from the server-side cursor per round trip
+BATCH_SIZE = 2000 # Documents written (and checkpointed) at a time
+GZIP_LEVEL = int(os.getenv('RAG_EXPORT_GZIP_LEVEL', '6'))
+MAX_SALES_PER_DOCUMENT = 10 # Most recent linked sales rendered per parcel
+
+# WI property class codes (PROPCLASS may hold several, comma-separated)
+PROPERTY_CLASSES = {
+    '1': 'residential',
+    '2': 'commercial',
+    '3': 'manufacturing',
+    '4': 'agricultural',
+    '5': 'undeveloped',
+    '5M': 'agricultural forest',
+    '6': 'productive forest',
+    '7': 'other',
+    'X1': 'federally exempt',
+    'X2': 'state exempt',
+    'X3': 'county exempt',
+    'X4': 'other exempt',
+}
+
+# One row per (property, linked sale), properties in id order and each parcel's
+# sales newest first. ix_properties_coname_id returns the county in id order and
+# the links' (property_id, event_date DESC) index feeds each parcel's sales, so
+# the final ORDER BY only needs an incremental sort within each parcel's rows
+# rather than a full sort of the county.
+# The {county} / {after_id} placeholders take the caller's parameter style.
+EXPORT_QUERY_TEMPLATE = f"""
+    SELECT p.id, p.synthetic_stateid, p."PARCELID", p."OWNERNME1", p."OWNERNME2", p."PSTLADRESS",
+           p."SITEADRESS", p."PLACENAME", p."ZIPCODE", p."CONAME", p."PROPCLASS", p."CNTASSDVALUE",
+           p."ESTFMKVALUE", p."GISACRES",
+           s.event_date, s."TotalRealEstateValue", s."TransferType", s."GranteeLastName", s."GranteeFirstName"
+    FROM properties p
+    LEFT JOIN LATERAL (
+        SELECT e.event_date, e."TotalRealEstateValue", e."TransferType", e."GranteeLastName", e."GranteeFirstName"
+        FROM event_property_links l
+        JOIN property_events e ON e.event_id = l.event_id AND e.event_date = l.event_date
+        WHERE l.property_id = p.id
+        ORDER BY l.event_date DESC
+        LIMIT {MAX_SALES_PER_DOCUMENT}
+    ) s ON TRUE
+    WHERE p."CONAME" = {{county}} AND p.id > {{after_id}}
+    ORDER BY p.id, s.event_date DESC;
+"""
+
+# --- Document Rendering ---
+
+def join_parts(*parts, separator=', '):
+    """Joins the non-empty parts with `separator`."""
+    return separator.join(str(part).strip() for part in parts if part is not None and str(part).strip())
+
+def format_money(value):
+    return f"${value:,.0f}" if value is not None else 'an unreported amount'
+
+def describe_property_class(propclass):
+    """Turns a PROPCLASS value such as '1,4' into 'residential / agricultural'."""
+    if not propclass:
+        return None
+    codes = [code.strip().upper() for code in str(propclass).split(',') if code.strip()]
+    return ' / '.join(PROPERTY_CLASSES.get(code, f"class {code}") for code in codes)
+
+def render_sales_history(rows):
+    """Renders the linked sales of a parcel (newest first); rows without a sale are skipped."""
+    sales = [row for row in rows if row['event_date'] is not None]
+    if not sales:
+        return "No recorded sales."
+    latest = sales[0]
+    text = f"Last sold on {latest['event_date']:%Y-%m-%d} for {format_money(latest['TotalRealEstateValue'])}"
+    buyer = join_parts(latest['GranteeFirstName'], latest['GranteeLastName'], separator=' ')
+    if buyer:
+        text += f" to {buyer}"
+    if latest['TransferType']:
+        text += f" (transfer type {latest['TransferType']})"
+    text += '.'
+    if len(sales) > 1:
+        earlier = '; '.join(
+            f"{sale['event_date']:%Y-%m-%d} for {format_money(sale['TotalRealEstateValue'])}" for sale in sales[1:]
+        )
+        text += f" Earlier sales: {earlier}."
+    return text
+
+def render_document(rows):
+    """
+    Renders one parcel as a RAG document (see Product-Spec 3.3) from its export
+    rows: the property columns repeated on every row, one row per linked sale.
+    Returns a dict ready to be written as a JSONL line.
+    """
+    parcel = rows[0]
+    county = (parcel['CONAME'] or '').title()
+    lines = [f"Property {parcel['PARCELID'] or parcel['synthetic_stateid']} is located in {county} County, WI."]
+    property_class = describe_property_class(parcel['PROPCLASS'])
+    if property_class:
+        lines[0] += f" Property class: {property_class}."
+
+    owner = join_parts(parcel['OWNERNME1'], parcel['OWNERNME2'], separator=' & ')
+    site_address = join_parts(parcel['SITEADRESS'], parcel['PLACENAME'], join_parts('WI', parcel['ZIPCODE'], separator=' '))
+    fields = [
+        ('Current Owner', owner),
+        ('Owner Mailing Address', parcel['PSTLADRESS']),
+        ('Property Address', site_address if parcel['SITEADRESS'] else None),
+        ('Assessed Value', format_money(parcel['CNTASSDVALUE']) if parcel['CNTASSDVALUE'] is not None else None),
+        ('Estimated Market Value', format_money(parcel['ESTFMKVALUE']) if parcel['ESTFMKVALUE'] is not None else None),
+        ('Acreage', f"{parcel['GISACRES']:.2f}" if parcel['GISACRES'] is not None else None),
+    ]
+    if parcel['PSTLADRESS'] and parcel['SITEADRESS']:
+        absentee = not str(parcel['PSTLADRESS']).upper().startswith(str(parcel['SITEADRESS']).upper())
+        fields.append(('Status', 'Absentee Owner' if absentee else 'Owner Occupied'))
+    fields.append(('Sales History', render_sales_history(rows)))
+    lines.extend(f"**{label}:** {value}" for label, value in fields if value)
+
+    return {
+        'id': parcel['id'],
+        'synthetic_stateid': parcel['synthetic_stateid'],
+        'parcel_id': parcel['PARCELID'],
+        'county': parcel['CONAME'],
+        'text': '\n'.join(lines),
+    }
+
+def encode_document(document):
+    """Serializes a document as one UTF-8 JSONL line."""
+    return (json.dumps(document, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+def render_documents(rows):
+    """Groups export rows (ordered by property id) into documents, one parcel at a time."""
+    for _, parcel_rows in itertools.groupby(rows, key=lambda row: row['id']):
+        yield render_document(list(parcel_rows))
+
+def split_last_parcel(rows):
+    """
+    Splits a block of export rows into the rows of its complete parcels and the
+    rows of its last parcel, which may continue in the next block fetched.
+    """
+    start = len(rows)
+    while start > 0 and rows[start - 1]['id'] == rows[-1]['id']:
+        start -= 1
+    return rows[:start], rows[start:]
+
+# --- Checkpointing ---
+# Output is appended in batches and each batch is followed by a checkpoint
+# holding the last exported property id and the output size at that point.
+# A resumed export truncates whatever was written after the checkpoint and
+# continues from the next property. Compressed exports write every batch as its
+# own gzip member, which gzip readers decompress as one continuous stream.
+
+def default_output_path(county, compress):
+    filename = f"{county.lower().replace(' ', '_')}.jsonl" + ('.gz' if compress else '')
+    return os.path.join(EXPORT_DIR, filename)
+
+def checkpoint_path(output_path):
+    return f"{output_path}.checkpoint.json"
+
+def load_checkpoint(output_path, county):
+    """Returns the saved progress of an interrupted export of `county`, or None."""
+    path = checkpoint_path(output_path)
+    if not os.path.exists(output_path):
+        return None
+    checkpoint = read_checkpoint(path)
+    if checkpoint is None:
+        return None
+    if checkpoint.get('county') != county:
+        logging.warning(f"Ignoring checkpoint for county {checkpoint.get('county')} at {path}.")
+        return None
+    return checkpoint
+
+def save_checkpoint(output_path, checkpoint):
+    write_checkpoint(checkpoint_path(output_path), checkpoint)
+
+def write_batch(output_file, documents, compress):
+    """Appends a batch of documents and makes it durable before it is checkpointed."""
+    data = b''.join(encode_document(document) for document in documents)
+    if compress:
+        data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    output_file.write(data)
+    output_file.flush()
+    os.fsync(output_file.fileno())
+    return output_file.tell()
+
+# --- Export ---
+
+def export_county(county, output_path=None, compress=False, restart=False):
+    """
+    Exports every parcel of `county` as JSONL RAG documents.
+    - Rows are streamed through a server-side cursor and written in batches, so
+      memory use does not depend on the size of the county.
+    - An interrupted export resumes from its checkpoint unless `restart` is set.
+    Returns the output path.
+    """
+    county = county.upper()
+    output_path = output_path or default_output_path(county, compress)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    checkpoint = None if restart else load_checkpoint(output_path, county)
+    if checkpoint:
+        logging.info(f"Resuming export of {county} after property {checkpoint['last_property_id']} "
+                     f"({checkpoint['documents']} documents already written).")
+    else:
+        checkpoint = {'county': county, 'last_property_id': 0, 'bytes_written': 0, 'documents': 0}
+
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        # Named cursor: the server keeps the result set and hands it out FETCH_SIZE rows at a time
+        with connection.cursor(name='rag_export', cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute(
+                EXPORT_QUERY_TEMPLATE.format(county='%(county)s', after_id='%(after_id)s'),
+                {'county': county, 'after_id': checkpoint['last_property_id']}
+            )
+
+            start_time = time.perf_counter()
+            exported = 0
+            # r+b so the tail after the checkpoint can be truncated before appending
+            mode = 'r+b' if checkpoint['bytes_written'] else 'wb'
+            with open(output_path, mode) as output_file:
+                output_file.truncate(checkpoint['bytes_written'])
+                output_file.seek(checkpoint['bytes_written'])
+
+                documents = render_documents(cursor)
+                while True:
+                    batch = list(itertools.islice(documents, BATCH_SIZE))
+                    if not batch:
+                        break
+                    checkpoint['bytes_written'] = write_batch(output_file, batch, compress)
+                    checkpoint['last_property_id'] = batch[-1]['id']
+                    checkpoint['documents'] += len(batch)
+                    save_checkpoint(output_path, checkpoint)
+                    exported += len(batch)
+                    elapsed = time.perf_counter() - start_time
+                    logging.info(f"Exported {checkpoint['documents']} documents "
+                                 f"({exported / max(elapsed, 1e-9):,.0f} documents/sec).")
+    finally:
+        connection.close()
+
+    if os.path.exists(checkpoint_path(output_path)):
+        os.remove(checkpoint_path(output_path))
+    if checkpoint['documents'] == 0:
+        logging.warning(f"No properties found for county {county}.")
+    logging.info(f"Exported {checkpoint['documents']} {county} documents to {output_path}.")
+    return output_path
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export a county's parcels and sales as JSONL documents for RAG.")
+    parser.add_argument('county', help="County to export, e.g. VILAS.")
+    parser.add_argument('--output', help=f"Output file (default: {EXPORT_DIR}/<county>.jsonl[.gz]).")
+    parser.add_argument('--gzip', action='store_true', help="Gzip-compress the output.")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore the checkpoint of an interrupted export and start over.")
+    args = parser.parse_args()
+    try:
+        export_county(args.county, output_path=args.output, compress=args.gzip, restart=args.restart)
+    except Exception as e:
+        logging.error(f"RAG export failed: {e}")
@@ -0,0 +1,141 @@
+import os
+import logging
+import argparse
+import time
+
+import psycopg2
+
+# --- Configuration ---
+# Database connection details from environment variables
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+SCORES_TABLE = 'parcel_scores'
+HOME_STATE = 'WI'
+SECONDS_PER_YEAR = 31557600
+
+# Points per signal; a parcel's score is the sum of the signals it shows (0-100)
+SCORE_WEIGHTS = {
+    'absentee_owner': 30, # Owner's mailing address is not the parcel's site address
+    'out_of_state_owner': 25, # Owner's mailing address is outside HOME_STATE
+    'tax_bill_elsewhere': 15, # Last sale's tax bill is mailed away from the property
+    'grantee_out_of_state': 10, # Last buyer's address is outside HOME_STATE
+}
+HOLDING_POINTS_PER_YEAR = 1 # Long holding periods add up to MAX_HOLDING_POINTS
+MAX_HOLDING_POINTS = 20
+
+# --- Signal Expressions ---
+# Addresses are compared on their uppercased alphanumeric characters, and a
+# mailing address "matches" a site address when it starts with it, since
+# PSTLADRESS carries the city, state and ZIP after the street. Site addresses are
+# tried both as written and in their canonical (USPS-abbreviated) form, so
+# '123 North Main Street' matches a mailing address of '123 N MAIN ST ...'.
+
+def squashed_address_sql(expression):
+    """SQL for an address with everything but letters and digits removed; NULL when empty."""
+    return f"NULLIF(regexp_replace(upper({expression}), '[^A-Z0-9]', '', 'g'), '')"
+
+def address_differs_sql(mailing_expression, *site_expressions):
+    """
+    SQL that is true when a mailing address starts with none of the given forms
+    of a site address, NULL when the mailing address or every site form is missing.
+    """
+    mailing = squashed_address_sql(mailing_expression)
+    sites = [squashed_address_sql(expression) for expression in site_expressions]
+    matches = ' OR '.join(f"COALESCE(starts_with({mailing}, {site}), false)" for site in sites)
+    return f"(CASE WHEN {mailing} IS NULL OR COALESCE({', '.join(sites)}) IS NULL THEN NULL ELSE NOT ({matches}) END)"
+
+def mailing_state_sql(expression):
+    """SQL extracting the 2-letter state that precedes the ZIP code at the end of an address."""
+    return f"substring(upper({expression}) from '([A-Z]{{2}})[[:space:]]+[0-9]{{5}}(-[0-9]{{4}})?[[:space:]]*$')"
+
+def out_of_state_sql(state_expression):
+    """SQL that is true when a state is not HOME_STATE, NULL when it is missing."""
+    return f"({state_expression} <> '{HOME_STATE}')"
+
+# Signal name -> SQL over properties `p` and parcel_current_state `cs`
+SIGNALS = {
+    'absentee_owner': address_differs_sql('p."PSTLADRESS"', 'p."SITEADRESS"', 'p.address_canonical'),
+    'out_of_state_owner': out_of_state_sql(mailing_state_sql('p."PSTLADRESS"')),
+    'tax_bill_elsewhere': address_differs_sql(
+        """concat_ws(' ', cs."TaxBillStreetNumber", cs."TaxBillAddress")""", 'cs."PropertyAddress"', 'p.address_canonical'
+    ),
+    'grantee_out_of_state': out_of_state_sql("""NULLIF(upper(trim(cs."GranteeState")), '')"""),
+}
+
+# --- Scoring ---
+
+def build_score_sql(property_filter='TRUE'):
+    """
+    Builds the statement that scores properties in one set-based pass and
+    upserts the results into parcel_scores.
+    - `property_filter` is a SQL condition on `properties` (aliased `p`) limiting
+      the parcels scored, e.g. a county or the parcels touched by a load.
+    - Sale-based signals come from the parcel's row in parcel_current_state.
+    - Rows are upserted in property id order, so two concurrent runs of this
+      statement take their row locks in the same order. Like the current state
+      refresh, callers run it once per transaction, just before committing.
+    The caller executes the statement with its driver's parameter style.
+    """
+    signal_columns = ', '.join(SIGNALS)
+    signal_selects = ',\n               '.join(f"{sql} AS {name}" for name, sql in SIGNALS.items())
+    signal_points = ' + '.join(f"CASE WHEN {name} THEN {weight} ELSE 0 END" for name, weight in SCORE_WEIGHTS.items())
+    updates = ', '.join(f"{col} = EXCLUDED.{col}" for col in [*SIGNALS, 'last_sale_date', 'holding_years', 'score'])
+    return f"""
+        INSERT INTO "{SCORES_TABLE}" (property_id, synthetic_stateid, "CONAME", {signal_columns},
+                                      last_sale_date, holding_years, score, scored_at)
+        SELECT property_id, synthetic_stateid, "CONAME", {signal_columns}, last_sale_date, holding_years,
+               {signal_points}
+               + COALESCE(LEAST(holding_years * {HOLDING_POINTS_PER_YEAR}, {MAX_HOLDING_POINTS}), 0),
+               NOW()
+        FROM (
+            SELECT p.id AS property_id, p.synthetic_stateid, p."CONAME",
+               {signal_selects},
+               cs.event_date AS last_sale_date,
+               GREATEST(EXTRACT(EPOCH FROM NOW() - cs.event_date) / {SECONDS_PER_YEAR}, 0) AS holding_years
+            FROM properties p
+            LEFT JOIN parcel_current_state cs ON cs.synthetic_stateid = p.synthetic_stateid
+            WHERE {property_filter}
+        ) signals
+        ORDER BY property_id
+        ON CONFLICT (property_id) DO UPDATE SET
+            "CONAME" = EXCLUDED."CONAME", synthetic_stateid = EXCLUDED.synthetic_stateid,
+            {updates}, scored_at = EXCLUDED.scored_at;
+    """
+
+def score_county_properties(cursor, county=None):
+    """Scores every parcel of `county` (all parcels when None). Returns the number of parcels scored."""
+    property_filter = 'p."CONAME" = %(county)s' if county else 'TRUE'
+    cursor.execute(build_score_sql(property_filter), {'county': county.upper() if county else None})
+    return cursor.rowcount
+
+def rescore(county=None):
+    """
+    Recomputes the scores of a county (or of every parcel). Loads keep scores
+    current incrementally; a periodic full rescore also ages the holding periods
+    of parcels that have not sold since.
+    """
+    start_time = time.perf_counter()
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        with connection.cursor() as cursor:
+            scored = score_county_properties(cursor, county)
+        connection.commit()
+    finally:
+        connection.close()
+    elapsed = time.perf_counter() - start_time
+    logging.info(f"Scored {scored} parcels in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f} parcels/sec).")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Recompute the absentee-owner target scores of parcels.")
+    parser.add_argument('--county', help="Only rescore this county, e.g. VILAS (default: all counties).")
+    args = parser.parse_args()
+    try:
+        rescore(args.county)
+    except Exception as e:
+        logging.error(f"Scoring failed: {e}")
@@ -3,11 +3,16 @@ import zipfile
 import os
 import glob
 import logging
-import re
+
+from normalization import apply_strategies, normalize_event_parcel_ids
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 DATA_DIR = '/app/data'
+CHUNK_SIZE = 200000
+
+# Format classes reported by the analysis, in report order
+FORMAT_CLASSES = ['Starts with PRCL', 'Purely Numeric (non-PRCL)', 'Hyphenated Numeric (non-PRCL)', 'Empty/Null', 'Unclassified']
 
 def find_csv_zip_paths():
     search_pattern_upper = os.path.join(DATA_DIR, '*CSV.zip')
@@ -15,6 +20,33 @@ def find_csv_zip_paths():
     zip_files = glob.glob(search_pattern_upper) + glob.glob(search_pattern_lower)
     return zip_files
 
+def classify_parcel_ids(parcel_ids):
+    """
+    Classifies a Series of raw RETR parcel IDs by format, using the same
+    normalization strategies as the loaders (see normalization/strategies/).
+    Returns a Series of FORMAT_CLASSES labels.
+    """
+    trimmed = apply_strategies(parcel_ids, ('default',))
+    prcl_stripped = apply_strategies(parcel_ids, ('default', 'strip_prcl'))
+    alphanumeric = apply_strategies(parcel_ids, ('default', 'universal_alphanumeric'))
+
+    text = trimmed.fillna('')
+    is_empty = text == ''
+    has_prcl = ~is_empty & (prcl_stripped != trimmed)
+    is_digits = alphanumeric.fillna('').str.isdigit()
+    # Digit groups joined by single hyphens, e.g. '012-3456-78'
+    is_hyphenated = (
+        is_digits & (text.str.replace('-', '', regex=False) == alphanumeric)
+        & ~text.str.contains('--', regex=False) & ~text.str.startswith('-') & ~text.str.endswith('-')
+    )
+
+    labels = pd.Series('Unclassified', index=parcel_ids.index, dtype=object)
+    labels[is_hyphenated] = 'Hyphenated Numeric (non-PRCL)'
+    labels[is_digits & (trimmed == alphanumeric)] = 'Purely Numeric (non-PRCL)'
+    labels[has_prcl] = 'Starts with PRCL'
+    labels[is_empty] = 'Empty/Null'
+    return labels
+
 def analyze_parcel_ids():
     logging.info("Starting granular ParcelIdentification analysis for all event files...")
     csv_zip_paths = find_csv_zip_paths()
@@ -22,12 +54,9 @@ def analyze_parcel_ids():
         logging.error("No CSV zip files found in data directory.")
         return
 
-    total_starts_with_prcl = 0
-    total_purely_numeric = 0
-    total_hyphenated_numeric_non_prcl = 0
-    total_empty_null = 0
-    total_unclassified = 0
+    totals = dict.fromkeys(FORMAT_CLASSES, 0)
     total_processed_records = 0
+    total_empty_keys = 0
 
     for zip_path in csv_zip_paths:
         logging.info(f"Analyzing ParcelIdentification in: {zip_path}")
@@ -37,39 +66,30 @@ def analyze_parcel_ids():
                 if not csv_filename:
                     logging.error(f"No CSV file found inside {zip_path}.")
                     continue
-                
+
                 with z.open(csv_filename) as f:
-                    df = pd.read_csv(f, low_memory=False, encoding='latin-1')
-                    
-                    if 'ParcelIdentification' in df.columns:
-                        parcel_ids = df['ParcelIdentification'].astype(str)
-                        
-                        for pid in parcel_ids:
-                            total_processed_records += 1
-                            pid_stripped = str(pid).strip()
+                    chunks = pd.read_csv(f, dtype=str, encoding='latin-1', chunksize=CHUNK_SIZE,
+                                         usecols=lambda col: col in ('ParcelIdentification', 'CountyName'))
+                    for chunk in chunks:
+                        if 'ParcelIdentification' not in chunk.columns:
+                            logging.error(f"ParcelIdentification column not found in {csv_filename}.")
+                            break
+                        total_processed_records += len(chunk)
+                        for label, count in classify_parcel_ids(chunk['ParcelIdentification']).value_counts().items():
+                            totals[label] += count
 
-                            if pd.isna(pid) or pid_stripped == '':
-                                total_empty_null += 1
-                            elif pid_stripped.startswith('PRCL'):
-                                total_starts_with_prcl += 1
-                            elif re.fullmatch(r'\\d+', pid_stripped):
-                                total_purely_numeric += 1
-                            elif re.fullmatch(r'\\d+(?:-\\d+)*', pid_stripped):
-                                total_hyphenated_numeric_non_prcl += 1
-                            else:
-                                total_unclassified += 1
-                    else:
-                        logging.error(f"ParcelIdentification column not found in {csv_filename}.")
+                        # IDs the county pipelines reduce to nothing cannot be matched to a parcel
+                        county_names = chunk['CountyName'] if 'CountyName' in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+                        keys = normalize_event_parcel_ids(chunk['ParcelIdentification'], county_names)
+                        total_empty_keys += int((chunk['ParcelIdentification'].notna() & (keys.isna() | (keys == ''))).sum())
         except Exception as e:
             logging.error(f"Failed to read or process CSV file {zip_path}: {e}")
 
     logging.info("--- Overall Granular Analysis Summary ---")
     logging.info(f"  Total records processed: {total_processed_records}")
-    logging.info(f"  Starts with 'PRCL': {total_starts_with_prcl}")
-    logging.info(f"  Purely Numeric (non-PRCL): {total_purely_numeric}")
-    logging.info(f"  Hyphenated Numeric (non-PRCL): {total_hyphenated_numeric_non_prcl}")
-    logging.info(f"  Empty/Null: {total_empty_null}")
-    logging.info(f"  Unclassified: {total_unclassified}")
+    for label in FORMAT_CLASSES:
+        logging.info(f"  {label}: {totals[label]}")
+    logging.info(f"  Non-empty IDs normalized to an empty key: {total_empty_keys}")
 
 if __name__ == "__main__":
-    analyze_parcel_ids()
\ No newline at end of file
+    analyze_parcel_ids()
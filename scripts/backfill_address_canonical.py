@@ -0,0 +1,132 @@
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+import psycopg2
+
+from bulk_load import copy_dataframe
+from event_chunks import EVENTS_HYPERTABLE, list_event_chunks, update_event_chunk
+from normalization import build_property_addresses, canonicalize_addresses
+from normalization.address import ADDRESS_NUMBER_COLUMNS, ADDRESS_STREET_COLUMNS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+PROPERTY_BATCH_SIZE = 50000 # Parcels canonicalized and updated per transaction
+
+# Fills address_canonical for rows loaded before the column existed (migration
+# f9b2c4e8a617). Only rows still NULL are touched, so an interrupted run can
+# simply be restarted. Loaders fill the column for everything loaded since.
+
+def fill_from_map(cursor, key_column, key_type, mapping, update_sql, params=None):
+    """Copies (key, address_canonical) pairs into a temp table and runs `update_sql` against it."""
+    cursor.execute(
+        f"CREATE TEMP TABLE address_canonical_map ({key_column} {key_type} PRIMARY KEY, address_canonical text) "
+        f"ON COMMIT DROP;"
+    )
+    copy_dataframe(cursor, mapping.dropna(subset=['address_canonical']), 'address_canonical_map')
+    cursor.execute(update_sql, params)
+    return cursor.rowcount
+
+def backfill_properties(connection):
+    """Canonicalizes parcel site addresses PROPERTY_BATCH_SIZE parcels per transaction, in id order."""
+    columns = ', '.join(f'"{col}"' for col in ['SITEADRESS', *ADDRESS_NUMBER_COLUMNS, *ADDRESS_STREET_COLUMNS])
+    last_id = 0
+    updated = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT id, {columns} FROM properties
+                WHERE id > %s AND address_canonical IS NULL
+                ORDER BY id LIMIT %s;
+                """,
+                (last_id, PROPERTY_BATCH_SIZE)
+            )
+            parcels = pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+            if parcels.empty:
+                break
+            mapping = pd.DataFrame({'id': parcels['id'], 'address_canonical': build_property_addresses(parcels)})
+            updated += fill_from_map(
+                cursor, 'id', 'integer', mapping,
+                """
+                UPDATE properties p SET address_canonical = m.address_canonical
+                FROM address_canonical_map m WHERE p.id = m.id;
+                """
+            )
+        connection.commit()
+        last_id = int(parcels['id'].iloc[-1])
+        logging.info(f"Backfilled {updated} parcels (up to id {last_id}).")
+    return updated
+
+def backfill_events(connection):
+    """
+    Canonicalizes event PropertyAddress values one hypertable chunk per
+    transaction (see event_chunks.py), each distinct address once.
+    """
+    with connection.cursor() as cursor:
+        chunks = list_event_chunks(cursor)
+    connection.commit()
+
+    updated = 0
+    for i, (chunk, range_start, range_end, is_compressed) in enumerate(chunks, start=1):
+        start_time = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT DISTINCT "PropertyAddress" FROM {EVENTS_HYPERTABLE}
+                WHERE event_date >= %s AND event_date < %s
+                  AND address_canonical IS NULL AND "PropertyAddress" IS NOT NULL;
+                """,
+                (range_start, range_end)
+            )
+            addresses = pd.Series([row[0] for row in cursor.fetchall()], dtype=object)
+            mapping = pd.DataFrame({'raw_address': addresses, 'address_canonical': canonicalize_addresses(addresses)})
+            # Addresses that canonicalize to nothing stay NULL; don't decompress a chunk for them
+            if mapping['address_canonical'].isna().all():
+                connection.rollback()
+                continue
+
+            chunk_updated = update_event_chunk(cursor, chunk, is_compressed, lambda: fill_from_map(
+                cursor, 'raw_address', 'text', mapping,
+                f"""
+                UPDATE {EVENTS_HYPERTABLE} e SET address_canonical = m.address_canonical
+                FROM address_canonical_map m
+                WHERE e."PropertyAddress" = m.raw_address AND e.address_canonical IS NULL
+                  AND e.event_date >= %s AND e.event_date < %s;
+                """,
+                (range_start, range_end)
+            ))
+        connection.commit()
+        updated += chunk_updated
+        logging.info(f"Chunk {i}/{len(chunks)} {chunk}: backfilled {chunk_updated} events "
+                     f"in {time.perf_counter() - start_time:.1f}s.")
+    return updated
+
+def backfill(properties=True, events=True):
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        if properties:
+            logging.info(f"Backfilled {backfill_properties(connection)} parcels in total.")
+        if events:
+            logging.info(f"Backfilled {backfill_events(connection)} events in total.")
+    except Exception as e:
+        connection.rollback()
+        logging.error(f"Backfill failed: {e}. Re-run to continue where it stopped.")
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill address_canonical for parcels and events loaded before the column existed.")
+    parser.add_argument('--skip-properties', action='store_true', help="Do not backfill properties.")
+    parser.add_argument('--skip-events', action='store_true', help="Do not backfill property_events.")
+    args = parser.parse_args()
+    backfill(properties=not args.skip_properties, events=not args.skip_events)
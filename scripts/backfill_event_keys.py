@@ -0,0 +1,119 @@
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+import psycopg2
+
+from bulk_load import copy_dataframe
+from current_state import build_refresh_sql
+from event_chunks import EVENTS_HYPERTABLE, list_event_chunks, update_event_chunk
+from event_links import build_link_statements
+from normalization import build_event_keys
+from scoring import score_county_properties
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Fills property_events.synthetic_stateid for events loaded before the column
+# existed (migration b7e2d9c41a06), then builds parcel_current_state and the
+# event links from them and rescores every parcel. Loaders maintain all of this
+# for events loaded since. Each chunk is committed on its own; the keys step
+# only touches NULL keys and the refresh and link upserts can be rerun, so an
+# interrupted run can simply be restarted.
+CHUNK_FILTER = "e.event_date >= %(range_start)s AND e.event_date < %(range_end)s"
+
+def backfill_chunk_keys(cursor, chunk, range_start, range_end, is_compressed):
+    """
+    Builds the synthetic STATEIDs of one chunk's events with the loaders'
+    build_event_keys(), each distinct (parcel ID, county) once.
+    Returns the number of events updated.
+    """
+    cursor.execute(
+        f"""
+        SELECT DISTINCT raw_parcel_identification, "CountyName" FROM {EVENTS_HYPERTABLE}
+        WHERE event_date >= %s AND event_date < %s AND synthetic_stateid IS NULL
+          AND raw_parcel_identification IS NOT NULL AND "CountyName" IS NOT NULL;
+        """,
+        (range_start, range_end)
+    )
+    pairs = pd.DataFrame(cursor.fetchall(), columns=['raw_parcel_identification', 'county_name'], dtype=object)
+    pairs['synthetic_stateid'] = build_event_keys(pairs['raw_parcel_identification'], pairs['county_name'])['synthetic_stateid']
+    pairs = pairs.dropna(subset=['synthetic_stateid'])
+    if pairs.empty:
+        return 0
+
+    def update_keys():
+        cursor.execute(
+            "CREATE TEMP TABLE event_key_map (raw_parcel_identification text, county_name text, "
+            "synthetic_stateid text, PRIMARY KEY (raw_parcel_identification, county_name)) ON COMMIT DROP;"
+        )
+        copy_dataframe(cursor, pairs, 'event_key_map')
+        cursor.execute(
+            f"""
+            UPDATE {EVENTS_HYPERTABLE} e SET synthetic_stateid = m.synthetic_stateid
+            FROM event_key_map m
+            WHERE e.raw_parcel_identification = m.raw_parcel_identification AND e."CountyName" = m.county_name
+              AND e.synthetic_stateid IS NULL AND {CHUNK_FILTER};
+            """,
+            {'range_start': range_start, 'range_end': range_end}
+        )
+        return cursor.rowcount
+
+    return update_event_chunk(cursor, chunk, is_compressed, update_keys)
+
+def fold_chunk(cursor, range_start, range_end):
+    """
+    Folds one chunk's events into parcel_current_state and links them to their
+    properties. Returns (state rows upserted, links created).
+    """
+    params = {'range_start': range_start, 'range_end': range_end}
+    cursor.execute(build_refresh_sql(CHUNK_FILTER), params)
+    refreshed = cursor.rowcount
+    linked = 0
+    for statement in build_link_statements(CHUNK_FILTER):
+        cursor.execute(statement, params)
+        linked += cursor.rowcount
+    return refreshed, linked
+
+def backfill():
+    connection = psycopg2.connect(DATABASE_URL)
+    try:
+        with connection.cursor() as cursor:
+            chunks = list_event_chunks(cursor)
+        connection.commit()
+
+        for i, (chunk, range_start, range_end, is_compressed) in enumerate(chunks, start=1):
+            start_time = time.perf_counter()
+            with connection.cursor() as cursor:
+                keyed = backfill_chunk_keys(cursor, chunk, range_start, range_end, is_compressed)
+                refreshed, linked = fold_chunk(cursor, range_start, range_end)
+            connection.commit()
+            logging.info(f"Chunk {i}/{len(chunks)} {chunk}: keyed {keyed} events, refreshed {refreshed} parcel states "
+                         f"and created {linked} links in {time.perf_counter() - start_time:.1f}s.")
+
+        logging.info("Rescoring every parcel...")
+        with connection.cursor() as cursor:
+            scored = score_county_properties(cursor)
+        connection.commit()
+        logging.info(f"Scored {scored} parcels.")
+    except Exception as e:
+        connection.rollback()
+        logging.error(f"Backfill failed: {e}. Re-run to continue where it stopped.")
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fill synthetic_stateid for events loaded before the column existed and build "
+                    "parcel_current_state, event links and scores from them."
+    )
+    parser.parse_args()
+    backfill()
@@ -0,0 +1,153 @@
+import argparse
+import logging
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from tabulate import tabulate
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DB_USER = os.getenv('POSTGRES_USER', 'user')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'password')
+DB_HOST = os.getenv('DB_HOST', 'timescaledb')
+DB_PORT = os.getenv('DB_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
+DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+HYPERTABLE = 'property_events'
+COMPRESS_AFTER = '6 months' # Same as the compression policy (migration b9c3e7a5f214)
+
+# Benchmark queries: name -> SQL taking :county, :start, :end and :parcel_id
+QUERIES = {
+    'county_date_range': """
+        SELECT COUNT(*), AVG("TotalRealEstateValue") FROM property_events
+        WHERE "CountyName" = :county AND event_date >= :start AND event_date < :end;
+    """,
+    'statewide_date_range': """
+        SELECT "CountyName", COUNT(*), SUM("TotalRealEstateValue") FROM property_events
+        WHERE event_date >= :start AND event_date < :end
+        GROUP BY "CountyName";
+    """,
+    'county_full_history': """
+        SELECT date_trunc('year', event_date) AS year, COUNT(*) FROM property_events
+        WHERE "CountyName" = :county
+        GROUP BY 1;
+    """,
+    'parcel_history': """
+        SELECT * FROM property_events
+        WHERE raw_parcel_identification = :parcel_id AND "CountyName" = :county
+        ORDER BY event_date DESC LIMIT 500;
+    """,
+}
+
+def measure_size(connection):
+    """Returns the on-disk size of the hypertable in bytes, split into heap, index and TOAST, plus chunk counts."""
+    sizes = connection.execute(text(
+        f"SELECT table_bytes, index_bytes, toast_bytes, total_bytes FROM hypertable_detailed_size('{HYPERTABLE}');"
+    )).mappings().one()
+    chunks = connection.execute(text(
+        f"""
+        SELECT COUNT(*) AS chunks, COUNT(*) FILTER (WHERE is_compressed) AS compressed_chunks
+        FROM timescaledb_information.chunks WHERE hypertable_name = '{HYPERTABLE}';
+        """
+    )).mappings().one()
+    return {**dict(sizes), **dict(chunks)}
+
+def time_queries(connection, params, repeat):
+    """Runs every benchmark query `repeat` times and returns the median time of each, in seconds."""
+    timings = {}
+    for name, sql in QUERIES.items():
+        durations = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            connection.execute(text(sql), params).fetchall()
+            durations.append(time.perf_counter() - start_time)
+        timings[name] = statistics.median(durations)
+        logging.info(f"{name}: {timings[name] * 1000:.1f} ms")
+    return timings
+
+def set_compression(engine, compress):
+    """Compresses the chunks the policy would compress, or decompresses every chunk, one chunk per transaction."""
+    if compress:
+        chunks_sql = f"SELECT c::text FROM show_chunks('{HYPERTABLE}', older_than => INTERVAL '{COMPRESS_AFTER}') c;"
+        action_sql = "SELECT compress_chunk(CAST(:chunk AS regclass), if_not_compressed => true);"
+    else:
+        chunks_sql = f"SELECT c::text FROM show_chunks('{HYPERTABLE}') c;"
+        action_sql = "SELECT decompress_chunk(CAST(:chunk AS regclass), if_compressed => true);"
+
+    with engine.connect() as connection:
+        chunks = connection.execute(text(chunks_sql)).scalars().all()
+        start_time = time.perf_counter()
+        for i, chunk in enumerate(chunks, start=1):
+            connection.execute(text(action_sql), {'chunk': chunk})
+            connection.commit()
+            if i % 10 == 0 or i == len(chunks):
+                logging.info(f"{'Compressed' if compress else 'Decompressed'} {i}/{len(chunks)} chunks.")
+        connection.execute(text(f"ANALYZE {HYPERTABLE};"))
+        connection.commit()
+    return time.perf_counter() - start_time
+
+def measure(engine, params, repeat):
+    with engine.connect() as connection:
+        return {**measure_size(connection), **time_queries(connection, params, repeat)}
+
+def run_benchmark(county, start, end, repeat, decompress_first):
+    """
+    Measures the size of property_events and the scan times of QUERIES, compresses
+    the chunks covered by the compression policy, and measures again.
+    - With `decompress_first`, every chunk is decompressed before the first
+      measurement so it reflects the uncompressed table.
+    """
+    try:
+        engine = create_engine(DATABASE_URL)
+        if decompress_first:
+            logging.info("Decompressing all chunks for the baseline...")
+            set_compression(engine, compress=False)
+
+        with engine.connect() as connection:
+            parcel_id = connection.execute(text(
+                """
+                SELECT raw_parcel_identification FROM property_events
+                WHERE "CountyName" = :county AND raw_parcel_identification IS NOT NULL LIMIT 1;
+                """
+            ), {'county': county}).scalar()
+        if parcel_id is None:
+            logging.error(f"No events found for county {county}.")
+            return
+        params = {'county': county, 'start': start, 'end': end, 'parcel_id': parcel_id}
+
+        logging.info("Measuring before compression...")
+        before = measure(engine, params, repeat)
+        logging.info(f"Compressing chunks older than {COMPRESS_AFTER}...")
+        compress_seconds = set_compression(engine, compress=True)
+        logging.info(f"Compression took {compress_seconds:.1f}s.")
+        logging.info("Measuring after compression...")
+        after = measure(engine, params, repeat)
+
+        rows = []
+        for metric in before:
+            if metric.endswith('_bytes'):
+                rows.append([metric, f"{before[metric] / 2**20:,.1f} MB", f"{after[metric] / 2**20:,.1f} MB",
+                             f"{before[metric] / after[metric]:.1f}x" if after[metric] else '-'])
+            elif metric in QUERIES:
+                rows.append([metric, f"{before[metric] * 1000:,.1f} ms", f"{after[metric] * 1000:,.1f} ms",
+                             f"{before[metric] / after[metric]:.1f}x" if after[metric] else '-'])
+            else:
+                rows.append([metric, before[metric], after[metric], ''])
+        print(tabulate(rows, headers=['metric', 'before', 'after', 'before/after'], tablefmt='github'))
+
+    except Exception as e:
+        logging.error(f"Benchmark failed: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare property_events disk size and scan times before and after compression.")
+    parser.add_argument('--county', default='VILAS', help="County used by the county queries (default: VILAS).")
+    parser.add_argument('--start', default='2015-01-01', help="Start of the date-range queries (default: 2015-01-01).")
+    parser.add_argument('--end', default='2020-01-01', help="End (exclusive) of the date-range queries (default: 2020-01-01).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per query; the median is reported (default: 5).")
+    parser.add_argument('--decompress-first', action='store_true',
+                        help="Decompress every chunk before measuring the baseline.")
+    args = parser.parse_args()
+    run_benchmark(args.county.upper(), args.start, args.end, args.repeat, args.decompress_first)
@@ -1,8 +1,10 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from tabulate import tabulate
+import argparse
 import logging
+import time
 import os
-import re
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -13,55 +15,78 @@ DB_PORT = os.getenv('DB_PORT', '5432')
 DB_NAME = os.getenv('POSTGRES_DB', 'property_finder')
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-def find_matches():
+# Strategy name -> match key column present on both properties and property_events
+STRATEGIES = {
+    'strip_prcl': 'parcel_key_stripped', # Strategy 1: strip PRCL only
+    'universal': 'parcel_key_normalized', # Strategy 2: universal normalization
+}
+
+def build_match_rate_query(county=None):
+    """
+    Builds the per-county match rate report. Each strategy is a semi-join of
+    events to the properties of the same county on that strategy's key column,
+    so every county is evaluated in a single set-based pass.
+    """
+    county_filter = 'AND e."CountyName" = :county' if county else ''
+    strategy_ctes = ','.join(
+        f"""
+        {name} AS (
+            SELECT e."CountyName", COUNT(*) AS matches
+            FROM property_events e
+            WHERE e.raw_parcel_identification IS NOT NULL {county_filter}
+              AND EXISTS (
+                  SELECT 1 FROM properties p
+                  WHERE p."CONAME" = e."CountyName" AND p.{key_column} = e.{key_column}
+              )
+            GROUP BY e."CountyName"
+        )"""
+        for name, key_column in STRATEGIES.items()
+    )
+    strategy_columns = ', '.join(f"COALESCE({name}.matches, 0) AS {name}" for name in STRATEGIES)
+    strategy_joins = '\n        '.join(f'LEFT JOIN {name} USING ("CountyName")' for name in STRATEGIES)
+    return text(
+        f"""
+        WITH events AS (
+            SELECT e."CountyName", COUNT(*) AS events
+            FROM property_events e
+            WHERE e.raw_parcel_identification IS NOT NULL {county_filter}
+            GROUP BY e."CountyName"
+        ),{strategy_ctes}
+        SELECT "CountyName" AS county, events, {strategy_columns}
+        FROM events
+        {strategy_joins}
+        ORDER BY "CountyName";
+        """
+    )
+
+def find_matches(county=None):
+    """Reports, per county and per strategy, how many events match a property."""
     logging.info("Connecting to database...")
     try:
         engine = create_engine(DATABASE_URL)
         with engine.connect() as connection:
-            # --- Get all Vilas County Property Records ---
-            property_df = pd.read_sql("SELECT \"PARCELID\" FROM properties WHERE \"CONAME\" = 'VILAS'", connection)
-            
-            # --- Build Hash Tables ---
-            logging.info("Building hash tables from property PARCELIDs...")
-            property_parcel_map_s1 = set()
-            property_parcel_map_s2 = {}
-            for index, row in property_df.iterrows():
-                if pd.notna(row['PARCELID']):
-                    # Strategy 1: No normalization on property PARCELID
-                    property_parcel_map_s1.add(str(row['PARCELID']).strip().upper())
-                    # Strategy 2: Universal normalization on property PARCELID
-                    normalized_id = ''.join(filter(str.isalnum, str(row['PARCELID']))).upper()
-                    property_parcel_map_s2[normalized_id] = row['PARCELID']
-            logging.info(f"Lookup set for Strategy 1 built with {len(property_parcel_map_s1)} unique PARCELIDs.")
-            logging.info(f"Hash table for Strategy 2 built with {len(property_parcel_map_s2)} unique normalized PARCELIDs.")
+            start_time = time.perf_counter()
+            params = {'county': county.upper()} if county else {}
+            report = pd.read_sql(build_match_rate_query(county), connection, params=params)
+            elapsed = time.perf_counter() - start_time
 
-            # --- Get all Vilas County Event Records ---
-            event_df = pd.read_sql("SELECT \"raw_parcel_identification\" FROM property_events WHERE \"CountyName\" = 'VILAS'", connection)
-            logging.info(f"Found {len(event_df)} events for Vilas County.")
+        if report.empty:
+            logging.info("No events found.")
+            return
 
-            # --- Perform Matching ---
-            matches_s1 = 0
-            matches_s2 = 0
-            for index, row in event_df.iterrows():
-                if (index + 1) % 1000 == 0:
-                    logging.info(f"Processing event {index + 1}/{len(event_df)}...")
-                if pd.notna(row['raw_parcel_identification']):
-                    raw_event_id = str(row['raw_parcel_identification']).strip().upper()
-                    
-                    # Strategy 1: Strip PRCL only
-                    cleaned_event_id_s1 = raw_event_id[4:] if raw_event_id.startswith('PRCL') else raw_event_id
-                    if cleaned_event_id_s1 in property_parcel_map_s1:
-                        matches_s1 += 1
+        totals = report.drop(columns=['county']).sum()
+        report.loc[len(report)] = ['TOTAL', *totals.tolist()]
+        for name in STRATEGIES:
+            report[f"{name}_rate"] = (report[name] / report['events'].where(report['events'] > 0)).map('{:.1%}'.format)
 
-                    # Strategy 2: Universal Normalization
-                    cleaned_event_id_s2 = re.sub(r'^PRCL[0-9]{3}-', '', raw_event_id)
-                    normalized_event_id_s2 = ''.join(filter(str.isalnum, cleaned_event_id_s2)).upper()
-                    if normalized_event_id_s2 in property_parcel_map_s2:
-                        matches_s2 += 1
-
-            logging.info("\n--- Results ---")
-            logging.info(f"Strategy 1 (Strip PRCL only): {matches_s1} matches")
-            logging.info(f"Strategy 2 (Universal Normalization): {matches_s2} matches")
+        logging.info(f"Match rates computed in {elapsed:.1f}s.")
+        print(tabulate(report, headers='keys', tablefmt='github', showindex=False))
 
     except Exception as e:
         logging.error(f"Failed to find matches: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report parcel ID match rates per county and strategy.")
+    parser.add_argument('--county', help="Only report this county, e.g. VILAS (default: all counties).")
+    args = parser.parse_args()
+    find_matches(county=args.county)
@@ -1,8 +1,16 @@
 import pandas as pd
+import numpy as np
 from sqlalchemy import create_engine, text
 import os
+import time
 import logging
-from fuzzywuzzy import fuzz
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rapidfuzz import fuzz, process
+
+from bulk_load import load_via_staging
+from event_links import link_fuzzy_matches
+from normalization import canonicalize_addresses
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,112 +26,298 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 # Data paths
 DATA_DIR = '/app/data'
 ORPHAN_EVENTS_FILE = os.path.join(DATA_DIR, 'orphan_events.csv')
+ORPHAN_COLUMNS = ['parcel_id', 'PropertyAddress', 'GranteeZip', 'CountyName']
+RESULTS_TABLE = 'parcel_match_results'
 
 # Fuzzy matching thresholds
 ADDRESS_SIMILARITY_THRESHOLD = 80 # Adjust as needed
 PARCEL_ID_SIMILARITY_THRESHOLD = 80 # Adjust as needed
 
-def normalize_string(s):
-    """Normalizes a string for comparison (uppercase, remove punctuation, extra spaces)."""
-    if not isinstance(s, str):
-        return ""
-    s = s.upper().strip()
-    s = ' '.join(s.split()) # Replace multiple spaces with single space
+# Orphans scored against a block's candidates at a time; bounds the score matrices
+# to ORPHAN_BATCH_SIZE x (candidates in the block) floats.
+ORPHAN_BATCH_SIZE = 256
+
+# Parallel matching: shards (one per zip code or fallback county) are spread over
+# MATCH_WORKERS processes; progress is logged every PROGRESS_INTERVAL_SECONDS.
+MATCH_WORKERS = int(os.getenv('MATCH_WORKERS', str(os.cpu_count() or 1)))
+PROGRESS_INTERVAL_SECONDS = 10
+ORPHAN_SHARD_COLUMNS = ['parcel_id', 'PropertyAddress', 'GranteeZip', 'CountyName', 'normalized_address', 'normalized_parcelid']
+CANDIDATE_SHARD_COLUMNS = ['STATEID', 'synthetic_stateid', 'normalized_siteaddress', 'normalized_parcelid']
+
+def normalize_strings(values):
+    """
+    Normalizes a Series of parcel IDs for comparison (uppercase, collapse spaces,
+    remove punctuation). Missing values become empty strings.
+    """
+    normalized = values.fillna('').astype(str).str.upper().str.split().str.join(' ')
     # Remove common punctuation that might differ but not change meaning
-    s = s.replace('.', '').replace(',', '').replace('-', '').replace('/', '')
-    return s
+    return normalized.str.replace(r'[.,\-/]', '', regex=True)
 
-def get_data_for_matching():
+def load_orphans(path=ORPHAN_EVENTS_FILE, limit=None):
     """
-    Fetches detailed data for orphan events and valid properties.
+    Reads the orphan events, one per (CountyName, parcel_id), with normalized match fields.
+    - Raw parcel IDs are only unique within a county, so orphans without a
+      CountyName are skipped: their matches could not be linked to the right events.
+    - GranteeZip is reduced to its digits before any decimal point ('54521.0' -> '54521').
     """
-    try:
-        logging.info(f"Reading orphan events from {ORPHAN_EVENTS_FILE}...")
-        orphan_df = pd.read_csv(ORPHAN_EVENTS_FILE, usecols=['parcel_id', 'PropertyAddress', 'GranteeZip']).drop_duplicates(subset=['parcel_id'])
-        orphan_df = orphan_df.dropna(subset=['parcel_id', 'PropertyAddress', 'GranteeZip'])
-        orphan_records = orphan_df.to_dict('records')
-        logging.info(f"Found {len(orphan_records)} unique orphan records with address and zip.")
+    logging.info(f"Reading orphan events from {path}...")
+    orphan_df = pd.read_csv(path, dtype=str, usecols=lambda col: col in ORPHAN_COLUMNS)
+    if 'CountyName' not in orphan_df.columns:
+        orphan_df['CountyName'] = None
+    county_names = orphan_df['CountyName'].str.strip().str.upper()
+    orphan_df['CountyName'] = county_names.where(county_names != '')
+    missing_county = orphan_df['parcel_id'].notna() & orphan_df['CountyName'].isna()
+    if missing_county.any():
+        logging.warning(f"Skipping {int(missing_county.sum())} orphan events without a CountyName.")
+    orphan_df = (orphan_df.dropna(subset=['parcel_id', 'CountyName', 'PropertyAddress'])
+                 .drop_duplicates(subset=['CountyName', 'parcel_id']))
+    if limit:
+        orphan_df = orphan_df.head(limit)
+    orphan_df = orphan_df.reset_index(drop=True)
 
-        logging.info("Connecting to the database to fetch valid property data...")
-        engine = create_engine(DATABASE_URL)
-        with engine.connect() as connection:
-            query = text('SELECT "STATEID", "PARCELID", "SITEADRESS", "ZIPCODE" FROM properties WHERE "SITEADRESS" IS NOT NULL AND "ZIPCODE" IS NOT NULL AND "PARCELID" IS NOT NULL;')
-            result = connection.execute(query)
-            valid_properties_df = pd.DataFrame(result.fetchall(), columns=result.keys())
-        
-        valid_properties_df['ZIPCODE'] = valid_properties_df['ZIPCODE'].astype(str).str.strip()
-        valid_properties_df['normalized_siteaddress'] = valid_properties_df['SITEADRESS'].apply(normalize_string)
-        valid_properties_df['normalized_parcelid'] = valid_properties_df['PARCELID'].apply(normalize_string)
-
-        logging.info(f"Found {len(valid_properties_df)} valid properties with address and zip.")
-        
-        return orphan_records, valid_properties_df
+    grantee_zips = orphan_df['GranteeZip'].str.split('.').str[0].str.strip()
+    orphan_df['GranteeZip'] = grantee_zips.where(grantee_zips != '')
+    orphan_df['normalized_address'] = canonicalize_addresses(orphan_df['PropertyAddress']).fillna('')
+    orphan_df['normalized_parcelid'] = normalize_strings(orphan_df['parcel_id'])
+    logging.info(f"Found {len(orphan_df)} unique orphan records with an address.")
+    return orphan_df
 
-    except Exception as e:
-        logging.error(f"Failed to get data for matching: {e}")
-        return None, None
+def load_candidate_properties(connection):
+    """
+    Fetches the properties that can be matched, with normalized match fields.
+    Site addresses come already canonicalized from the address_canonical column.
+    """
+    logging.info("Fetching valid property data...")
+    query = text(
+        'SELECT "STATEID", synthetic_stateid, "PARCELID", address_canonical, "ZIPCODE", "CONAME" FROM properties '
+        'WHERE address_canonical IS NOT NULL AND "PARCELID" IS NOT NULL AND ("ZIPCODE" IS NOT NULL OR "CONAME" IS NOT NULL);'
+    )
+    result = connection.execute(query)
+    properties_df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    properties_df['ZIPCODE'] = properties_df['ZIPCODE'].astype(str).str.strip().where(properties_df['ZIPCODE'].notna())
+    properties_df['CONAME'] = properties_df['CONAME'].str.strip().str.upper()
+    properties_df['normalized_siteaddress'] = properties_df['address_canonical']
+    properties_df['normalized_parcelid'] = normalize_strings(properties_df['PARCELID'])
+    logging.info(f"Found {len(properties_df)} valid properties with an address.")
+    return properties_df
+
+def build_candidate_index(properties_df, key_column):
+    """Groups the candidate properties by a blocking key once: {key: candidates DataFrame}."""
+    candidates = properties_df[CANDIDATE_SHARD_COLUMNS + [key_column]]
+    return {
+        key: group[CANDIDATE_SHARD_COLUMNS].reset_index(drop=True)
+        for key, group in candidates.groupby(key_column)
+    }
+
+def score_block(orphans, candidates, address_threshold, parcel_id_threshold, kernel_workers=-1):
+    """
+    Finds the best candidate for every orphan of one block.
+    - Address and parcel ID similarities are computed for the whole block with
+      rapidfuzz's cdist on `kernel_workers` threads (-1: all cores),
+      ORPHAN_BATCH_SIZE orphans at a time.
+    - A candidate qualifies when both scores reach their thresholds; the best one
+      has the highest average of the two (the first candidate wins ties).
+    Returns (best_positions, address_scores, parcel_id_scores) aligned with `orphans`;
+    the position is -1 where no candidate qualifies.
+    """
+    best_positions = np.full(len(orphans), -1)
+    best_address_scores = np.zeros(len(orphans), dtype=np.float32)
+    best_parcel_id_scores = np.zeros(len(orphans), dtype=np.float32)
+    candidate_addresses = candidates['normalized_siteaddress'].tolist()
+    candidate_parcel_ids = candidates['normalized_parcelid'].tolist()
+
+    for start in range(0, len(orphans), ORPHAN_BATCH_SIZE):
+        batch = orphans.iloc[start:start + ORPHAN_BATCH_SIZE]
+        # Scores below the cutoff come back as 0, so non-zero means "meets the threshold"
+        address_scores = process.cdist(batch['normalized_address'].tolist(), candidate_addresses,
+                                       scorer=fuzz.ratio, score_cutoff=address_threshold,
+                                       dtype=np.float32, workers=kernel_workers)
+        parcel_id_scores = process.cdist(batch['normalized_parcelid'].tolist(), candidate_parcel_ids,
+                                         scorer=fuzz.ratio, score_cutoff=parcel_id_threshold,
+                                         dtype=np.float32, workers=kernel_workers)
+        combined_scores = (address_scores + parcel_id_scores) / 2
+        qualifies = (address_scores >= address_threshold) & (parcel_id_scores >= parcel_id_threshold)
+        combined_scores[~qualifies] = 0
+
+        rows = np.arange(len(batch))
+        best = combined_scores.argmax(axis=1)
+        matched = combined_scores[rows, best] > 0
+        batch_slice = slice(start, start + len(batch))
+        best_positions[batch_slice] = np.where(matched, best, -1)
+        best_address_scores[batch_slice] = np.where(matched, address_scores[rows, best], 0)
+        best_parcel_id_scores[batch_slice] = np.where(matched, parcel_id_scores[rows, best], 0)
+
+    return best_positions, best_address_scores, best_parcel_id_scores
+
+def match_block(orphans, candidates, blocking_key, address_threshold, parcel_id_threshold, kernel_workers=-1):
+    """Scores one block and returns its rows of the results table."""
+    best_positions, address_scores, parcel_id_scores = score_block(
+        orphans, candidates, address_threshold, parcel_id_threshold, kernel_workers
+    )
+    matched = best_positions >= 0
+    matched_candidates = candidates.iloc[best_positions[matched]]
 
-def find_best_match(orphan_record, candidate_properties_df):
+    results = pd.DataFrame({
+        'parcel_id': orphans['parcel_id'].to_numpy(),
+        'property_address': orphans['PropertyAddress'].to_numpy(),
+        'grantee_zip': orphans['GranteeZip'].to_numpy(),
+        'county_name': orphans['CountyName'].to_numpy(),
+        'blocking_key': blocking_key,
+        'matched_stateid': None,
+        'matched_synthetic_stateid': None,
+        'address_score': np.where(matched, address_scores, np.nan),
+        'parcel_id_score': np.where(matched, parcel_id_scores, np.nan),
+    })
+    results.loc[matched, 'matched_stateid'] = matched_candidates['STATEID'].to_numpy()
+    results.loc[matched, 'matched_synthetic_stateid'] = matched_candidates['synthetic_stateid'].to_numpy()
+    results['combined_score'] = (results['address_score'] + results['parcel_id_score']) / 2
+    return results
+
+def unmatched_results(orphans):
+    """Returns result rows for orphans that have no block of candidates at all."""
+    return pd.DataFrame({
+        'parcel_id': orphans['parcel_id'].to_numpy(),
+        'property_address': orphans['PropertyAddress'].to_numpy(),
+        'grantee_zip': orphans['GranteeZip'].to_numpy(),
+        'county_name': orphans['CountyName'].to_numpy(),
+        'blocking_key': None,
+    })
+
+def build_shards(orphans, properties_df):
     """
-    Finds the best matching STATEID for an orphan record among candidates
-    using fuzzy matching on address and parcel ID.
+    Partitions the orphans and candidate properties by blocking key.
+    - Orphans are compared with the properties sharing their zip code.
+    - Orphans whose zip is missing or has no properties fall back to the
+      properties of their county.
+    Returns (shards, unblocked): (blocking_key, orphans, candidates) tuples,
+    largest first so long shards start early, and the orphans without any block.
     """
-    best_match_stateid = "NO_MATCH"
-    highest_combined_score = 0
+    zip_index = build_candidate_index(properties_df, 'ZIPCODE')
+    county_index = build_candidate_index(properties_df, 'CONAME')
+    logging.info(f"Candidate index built for {len(zip_index)} zip codes and {len(county_index)} counties.")
+
+    orphans = orphans[ORPHAN_SHARD_COLUMNS]
+    shards = []
+    has_zip_block = orphans['GranteeZip'].isin(zip_index.keys())
+    for zip_code, block in orphans[has_zip_block].groupby('GranteeZip'):
+        shards.append(('ZIP', block, zip_index[zip_code]))
 
-    normalized_orphan_address = normalize_string(orphan_record['PropertyAddress'])
-    normalized_orphan_parcel_id = normalize_string(orphan_record['parcel_id'])
+    fallback = orphans[~has_zip_block]
+    has_county_block = fallback['CountyName'].isin(county_index.keys())
+    for county, block in fallback[has_county_block].groupby('CountyName'):
+        shards.append(('COUNTY', block, county_index[county]))
 
-    for _, candidate in candidate_properties_df.iterrows():
-        address_score = fuzz.ratio(normalized_orphan_address, candidate['normalized_siteaddress'])
-        parcel_id_score = fuzz.ratio(normalized_orphan_parcel_id, candidate['normalized_parcelid'])
-        
-        # Combine scores - you might want to weight these differently
-        combined_score = (address_score + parcel_id_score) / 2
+    shards.sort(key=lambda shard: len(shard[1]) * len(shard[2]), reverse=True)
+    return shards, fallback[~has_county_block]
+
+def iter_shard_results(shards, address_threshold, parcel_id_threshold, workers):
+    """
+    Yields the results of every shard as it finishes.
+    - With `workers` > 1, each shard is sent once to a pool of processes, so a
+      worker only ever holds the orphans and candidates of the shard it is
+      scoring. Each worker scores on a single thread to avoid oversubscribing cores.
+    - With one worker, shards are scored in this process on all cores.
+    """
+    if workers <= 1:
+        for blocking_key, shard_orphans, candidates in shards:
+            yield match_block(shard_orphans, candidates, blocking_key, address_threshold, parcel_id_threshold)
+        return
 
-        if combined_score > highest_combined_score and \
-           address_score >= ADDRESS_SIMILARITY_THRESHOLD and \
-           parcel_id_score >= PARCEL_ID_SIMILARITY_THRESHOLD:
-            highest_combined_score = combined_score
-            best_match_stateid = candidate['STATEID']
-            
-    return best_match_stateid
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(match_block, shard_orphans, candidates, blocking_key,
+                            address_threshold, parcel_id_threshold, 1)
+            for blocking_key, shard_orphans, candidates in shards
+        ]
+        for future in as_completed(futures):
+            yield future.result()
 
-def match_parcels_programmatically(orphans, properties_df, num_to_process=100):
+def match_parcels_programmatically(orphans, properties_df, address_threshold=ADDRESS_SIMILARITY_THRESHOLD,
+                                   parcel_id_threshold=PARCEL_ID_SIMILARITY_THRESHOLD, workers=1):
     """
-    Processes orphan records programmatically to find matches.
+    Matches every orphan record to a property, shard by shard (see build_shards()),
+    on `workers` processes, and logs progress as shards finish.
+    Returns one result row per orphan.
     """
-    logging.info("Starting programmatic fuzzy parcel matching...")
-    
-    orphans_to_process = orphans[:num_to_process]
+    logging.info(f"Starting programmatic fuzzy parcel matching with {workers} worker(s)...")
+    shards, unblocked = build_shards(orphans, properties_df)
+    total_orphans = sum(len(shard_orphans) for _, shard_orphans, _ in shards)
+    logging.info(f"Split {total_orphans} orphans into {len(shards)} shards; {len(unblocked)} orphans have no candidates.")
+
+    results = [unmatched_results(unblocked)]
+    orphans_done = 0
     match_count = 0
+    start_time = time.perf_counter()
+    last_report = start_time
+    for shards_done, shard_results in enumerate(
+            iter_shard_results(shards, address_threshold, parcel_id_threshold, workers), start=1):
+        results.append(shard_results)
+        orphans_done += len(shard_results)
+        match_count += int(shard_results['matched_stateid'].notna().sum())
+
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_INTERVAL_SECONDS or shards_done == len(shards):
+            last_report = now
+            elapsed = now - start_time
+            logging.info(f"Matched {shards_done}/{len(shards)} shards, {orphans_done}/{total_orphans} orphans "
+                         f"({match_count} matches) in {elapsed:.1f}s "
+                         f"({orphans_done / max(elapsed, 1e-9):,.0f} orphans/sec).")
+
+    return pd.concat(results, ignore_index=True)
+
+def write_results(engine, results):
+    """
+    Replaces the contents of the results table with this run's results via COPY,
+    and the fuzzy event links with links built from them, in one transaction.
+    """
+    raw_connection = engine.raw_connection()
+    try:
+        with raw_connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE TABLE "{RESULTS_TABLE}";')
+            rows = load_via_staging(cursor, results, RESULTS_TABLE)
+            linked = link_fuzzy_matches(cursor, RESULTS_TABLE)
+        raw_connection.commit()
+    except Exception:
+        raw_connection.rollback()
+        raise
+    finally:
+        raw_connection.close()
+    logging.info(f"Wrote {rows} match results to '{RESULTS_TABLE}' and linked {linked} events.")
+
+def run_matching(orphans_path=ORPHAN_EVENTS_FILE, address_threshold=ADDRESS_SIMILARITY_THRESHOLD,
+                 parcel_id_threshold=PARCEL_ID_SIMILARITY_THRESHOLD, limit=None, workers=MATCH_WORKERS):
+    """Matches all orphan events and stores the results in the database."""
+    try:
+        orphans = load_orphans(orphans_path, limit)
+        engine = create_engine(DATABASE_URL)
+        with engine.connect() as connection:
+            properties_df = load_candidate_properties(connection)
+
+        start_time = time.perf_counter()
+        results = match_parcels_programmatically(orphans, properties_df, address_threshold,
+                                                 parcel_id_threshold, workers)
+        elapsed = time.perf_counter() - start_time
 
-    logging.info("--- Proposed Mappings (from programmatic logic) ---")
-    for orphan in orphans_to_process:
-        orphan_zip = str(orphan.get('GranteeZip', '')).split('.')[0]
-        if not orphan_zip:
-            print(f"Orphan: {orphan['parcel_id']} -> Match: NO_MATCH (Missing Zip)")
-            continue
-
-        # Filter candidates by zip code (blocking step)
-        candidate_properties_df = properties_df[properties_df['ZIPCODE'] == orphan_zip]
-        
-        if candidate_properties_df.empty:
-            print(f"Orphan: {orphan['parcel_id']} -> Match: NO_MATCH (No candidates for zip {orphan_zip})")
-            continue
-
-        best_match = find_best_match(orphan, candidate_properties_df)
-        
-        if best_match != "NO_MATCH":
-            match_count += 1
-        print(f"Orphan: {orphan['parcel_id']} -> Match: {best_match}")
-
-    logging.info(f"Found {match_count} potential matches out of {len(orphans_to_process)} orphans processed.")
-    logging.info("--- End of Mappings ---")
+        match_count = int(results['matched_stateid'].notna().sum())
+        logging.info(f"Found {match_count} matches out of {len(results)} orphans in {elapsed:.1f}s "
+                     f"({len(results) / max(elapsed, 1e-9):,.0f} orphans/sec).")
+        for blocking_key, count in results['blocking_key'].fillna('NONE').value_counts().items():
+            logging.info(f"  {blocking_key}: {count} orphans")
+
+        write_results(engine, results)
+    except Exception as e:
+        logging.error(f"Failed to match orphan events: {e}")
 
 if __name__ == "__main__":
-    orphan_records, valid_properties_df = get_data_for_matching()
-    if orphan_records and not valid_properties_df.empty:
-        match_parcels_programmatically(orphan_records, valid_properties_df)
-    else:
-        logging.error("Could not retrieve data for matching. Aborting.")
+    parser = argparse.ArgumentParser(description="Fuzzy match orphan events to properties by address and parcel ID.")
+    parser.add_argument('--orphans', default=ORPHAN_EVENTS_FILE, help=f"Orphan events CSV (default: {ORPHAN_EVENTS_FILE}).")
+    parser.add_argument('--address-threshold', type=float, default=ADDRESS_SIMILARITY_THRESHOLD,
+                        help=f"Minimum address similarity, 0-100 (default: {ADDRESS_SIMILARITY_THRESHOLD}).")
+    parser.add_argument('--parcel-id-threshold', type=float, default=PARCEL_ID_SIMILARITY_THRESHOLD,
+                        help=f"Minimum parcel ID similarity, 0-100 (default: {PARCEL_ID_SIMILARITY_THRESHOLD}).")
+    parser.add_argument('--limit', type=int, help="Only match the first N orphans (default: all).")
+    parser.add_argument('--workers', type=int, default=MATCH_WORKERS,
+                        help=f"Matching processes (default: MATCH_WORKERS or the CPU count, {MATCH_WORKERS}).")
+    args = parser.parse_args()
+    run_matching(args.orphans, args.address_threshold, args.parcel_id_threshold, args.limit, args.workers)
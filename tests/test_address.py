@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from normalization.address import canonicalize_address, canonicalize_addresses
+
+# (raw address line, expected canonical form)
+CANONICAL_CASES = [
+    ('123 North Main Street, Apartment 2', '123 N MAIN ST APT 2'),
+    ('123 n. main st.', '123 N MAIN ST'),
+    ('45 Main Street North', '45 MAIN ST N'),
+    ('45 North St', '45 NORTH ST'),
+    ('45 West Avenue', '45 WEST AVE'),
+    ('123 1/2 Oak Ave', '123 1/2 OAK AVE'),
+    ('123 Main St #4', '123 MAIN ST # 4'),
+    ('123 Main St Unit', '123 MAIN ST'),
+    ('100 Suite Ave', '100 SUITE AVE'),
+    ('100 Lake Shore Dr Suite 200', '100 LAKE SHORE DR STE 200'),
+    ("12 O'Neil Rd", '12 ONEIL RD'),
+    ('CTH K', 'CO HWY K'),
+    ('W5678 County Road K', 'W5678 CO HWY K'),
+    ('W5678 Cty Rd K', 'W5678 CO HWY K'),
+    ('W5678 County Highway K', 'W5678 CO HWY K'),
+    ('N1234 STH 70', 'N1234 STATE HWY 70'),
+    ('N1234 USH 51 Lot 3', 'N1234 US HWY 51 LOT 3'),
+    ('', None),
+    ('   ', None),
+    (None, None),
+]
+
+@pytest.mark.parametrize('address, expected', CANONICAL_CASES)
+def test_canonicalize_address(address, expected):
+    assert canonicalize_address(address) == expected
+
+def test_canonicalize_addresses_matches_per_address():
+    addresses = pd.Series([case[0] for case in CANONICAL_CASES] + ['CTH K'], index=range(10, 31), dtype=object)
+    canonical = canonicalize_addresses(addresses)
+    assert canonical.index.equals(addresses.index)
+    assert canonical.tolist() == [case[1] for case in CANONICAL_CASES] + ['CO HWY K']
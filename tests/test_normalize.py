@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from normalization import build_synthetic_stateids
+
+# (PARCELID, PARCELFIPS, synthetic STATEID from the original per-row
+# ingest_geodata.create_synthetic_stateid); the vectorized keys must match byte for byte
+LEGACY_STATEID_CASES = [
+    ('012-3456-78', 125, '125012345678'),
+    ('012-3456-78', 125.0, '125012345678'),
+    ('012-3456-78', '125', '125012345678'),
+    ('  prcl 0042 ', 7, '007PRCL0042'),
+    ('A.B/C_D', 1, '001ABCD'),
+    ('çà-12', 55, '055ÇÀ12'),
+    ('x²', 3, '003X²'),
+    (42, '009', '00942'),
+    ('1 2 3', 99.0, '099123'),
+    ('', 12, '012'),
+    ('--', 12, '012'),
+    (None, 125, None),
+    ('123', None, None),
+    ('123', np.nan, None),
+]
+
+@pytest.mark.parametrize('parcel_id, fips_code, expected', LEGACY_STATEID_CASES)
+def test_build_synthetic_stateids_matches_legacy(parcel_id, fips_code, expected):
+    stateids = build_synthetic_stateids(pd.Series([parcel_id], dtype=object), pd.Series([fips_code], dtype=object))
+    assert stateids.iloc[0] == expected
+
+def test_build_synthetic_stateids_numeric_fips_column():
+    # PARCELFIPS is read from the GDB as a float column, with NaN for missing codes
+    parcel_ids = pd.Series(['012-3456-78', 'A.B/C_D', '123', None], dtype=object)
+    fips_codes = pd.Series([125.0, 1.0, np.nan, 7.0])
+    assert build_synthetic_stateids(parcel_ids, fips_codes).tolist() == ['125012345678', '001ABCD', None, None]
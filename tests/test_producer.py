@@ -0,0 +1,83 @@
+import io
+import json
+import logging
+import zipfile
+
+import pandas as pd
+import sqlalchemy as sa
+
+from consumer import parse_event
+from producer import build_messages, read_csv_chunks
+
+# A RETR export: the columns the producer and consumer rely on, in the archive's names
+RETR_CSV = (
+    'ParcelIdentification,CountyName,DeedDate,DateRecorded,PropertyAddress,SaleNumber\n'
+    '012-3456-78,VILAS,2023-05-01,2023-05-03,123 North Main Street,1001\n'
+    '0042,ONEIDA,2023-06-15,2023-06-20,45 Lake Shore Dr,01002\n'
+)
+
+EVENTS_TABLE = sa.Table(
+    'property_events', sa.MetaData(),
+    sa.Column('event_id', sa.Integer),
+    sa.Column('event_date', sa.DateTime),
+    sa.Column('event_type', sa.String),
+    sa.Column('source', sa.String),
+    sa.Column('raw_parcel_identification', sa.String),
+    sa.Column('CountyName', sa.String),
+    sa.Column('DateRecorded', sa.DateTime),
+    sa.Column('PropertyAddress', sa.String),
+    sa.Column('SaleNumber', sa.String),
+    sa.Column('address_canonical', sa.String),
+)
+
+def write_archive(tmp_path, csv_text):
+    zip_path = tmp_path / 'retr_CSV.zip'
+    with zipfile.ZipFile(zip_path, 'w') as z:
+        z.writestr('retr.csv', csv_text)
+    return str(zip_path)
+
+def test_build_messages_maps_retr_columns():
+    messages, row_positions = build_messages(pd.read_csv(io.StringIO(RETR_CSV), dtype=str))
+    assert row_positions.tolist() == [0, 1]
+
+    first = json.loads(messages[0])
+    assert first['parcel_id'] == '012-3456-78'
+    assert first['event_date'] == '2023-05-01T00:00:00'
+    assert first['source'] == 'RETR_CSV'
+    assert first['data']['ParcelIdentification'] == '012-3456-78'
+    assert first['data']['CountyName'] == 'VILAS'
+
+def test_build_messages_falls_back_to_date_recorded(caplog):
+    df = pd.DataFrame({
+        'ParcelIdentification': ['1', '2', '3'],
+        'DeedDate': [None, 'not a date', None],
+        'DateRecorded': ['2023-05-03', '2023-06-20', None],
+    })
+    with caplog.at_level(logging.WARNING):
+        messages, row_positions = build_messages(df)
+
+    assert row_positions.tolist() == [0, 1]
+    assert [json.loads(message)['event_date'] for message in messages] == ['2023-05-03T00:00:00', '2023-06-20T00:00:00']
+    assert 'Skipping 1 rows' in caplog.text
+
+def test_retr_archive_round_trips_through_consumer(tmp_path):
+    chunks = list(read_csv_chunks(write_archive(tmp_path, RETR_CSV)))
+    messages, _ = build_messages(pd.concat(chunks))
+    rows = [parse_event(message, EVENTS_TABLE) for message in messages]
+
+    assert [row['raw_parcel_identification'] for row in rows] == ['012-3456-78', '0042']
+    assert [row['SaleNumber'] for row in rows] == ['1001', '01002']
+    assert [row['event_date'] for row in rows] == ['2023-05-01T00:00:00', '2023-06-15T00:00:00']
+    assert [row['CountyName'] for row in rows] == ['VILAS', 'ONEIDA']
+    assert rows[0]['address_canonical'] == '123 N MAIN ST'
+    assert 'event_id' not in rows[0]
+
+def test_read_csv_chunks_keeps_text_across_chunks(tmp_path):
+    # The first chunk looks numeric and the second does not; both stay text
+    csv_text = RETR_CSV.splitlines(keepends=True)[0] + ''.join(
+        f'00{i},VILAS,2023-05-01,,,{i}\n' for i in range(3)
+    ) + 'PRCL 7,VILAS,2023-05-01,,,A1\n'
+    chunks = list(read_csv_chunks(write_archive(tmp_path, csv_text), chunksize=3))
+    assert chunks[0]['ParcelIdentification'].tolist() == ['000', '001', '002']
+    assert chunks[1]['ParcelIdentification'].tolist() == ['PRCL 7']
+    assert all(isinstance(value, str) for chunk in chunks for value in chunk['SaleNumber'])
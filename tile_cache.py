@@ -0,0 +1,85 @@
+import os
+import math
+import shutil
+import logging
+import tempfile
+
+# --- Configuration ---
+DATA_DIR = '/app/data'
+TILE_CACHE_DIR = os.getenv('TILE_CACHE_DIR', os.path.join(DATA_DIR, 'tiles'))
+MAX_MERCATOR_LATITUDE = 85.0511287798 # Web Mercator cuts off the poles here
+
+# --- Tile Cache ---
+# Rendered Mapbox Vector Tiles are stored as {TILE_CACHE_DIR}/{z}/{x}/{y}.mvt and
+# written by the query service. The parcel loader invalidates them after a reload.
+
+def tile_path(z, x, y):
+    """Returns the cache file path of a tile."""
+    return os.path.join(TILE_CACHE_DIR, str(z), str(x), f"{y}.mvt")
+
+def read_tile(z, x, y):
+    """Returns the cached bytes of a tile, or None when it is not cached."""
+    try:
+        with open(tile_path(z, x, y), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def write_tile(z, x, y, content):
+    """
+    Stores a rendered tile. The file is written under a temporary name and then
+    renamed, so concurrent readers never see a partially written tile.
+    """
+    path = tile_path(z, x, y)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def lon_lat_to_tile(z, lon, lat):
+    """Returns the (x, y) of the zoom-z Web Mercator tile containing a WGS 84 point."""
+    lat = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, lat))
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def clear_tiles():
+    """Deletes every cached tile, e.g. after a statewide reload."""
+    if os.path.isdir(TILE_CACHE_DIR):
+        shutil.rmtree(TILE_CACHE_DIR)
+        logging.info(f"Cleared the tile cache at {TILE_CACHE_DIR}.")
+
+def invalidate_bbox(min_lon, min_lat, max_lon, max_lat):
+    """
+    Deletes the cached tiles, at every cached zoom level, that intersect a WGS 84
+    bounding box. Only the x directories within the box's tile range are visited,
+    so invalidating one county does not walk the whole cache.
+    Returns the number of tiles removed.
+    """
+    if not os.path.isdir(TILE_CACHE_DIR):
+        return 0
+
+    removed = 0
+    for z_name in os.listdir(TILE_CACHE_DIR):
+        if not z_name.isdigit():
+            continue
+        z = int(z_name)
+        min_x, min_y = lon_lat_to_tile(z, min_lon, max_lat) # Tile y grows southwards
+        max_x, max_y = lon_lat_to_tile(z, max_lon, min_lat)
+        for x in range(min_x, max_x + 1):
+            x_dir = os.path.join(TILE_CACHE_DIR, z_name, str(x))
+            if not os.path.isdir(x_dir):
+                continue
+            for file_name in os.listdir(x_dir):
+                y_name = file_name[:-len('.mvt')]
+                if file_name.endswith('.mvt') and y_name.isdigit() and min_y <= int(y_name) <= max_y:
+                    os.remove(os.path.join(x_dir, file_name))
+                    removed += 1
+    logging.info(f"Invalidated {removed} cached tiles in ({min_lon}, {min_lat}, {max_lon}, {max_lat}).")
+    return removed